@@ -10,13 +10,155 @@ These are matched via sha256_hash in the module_binary_map table.
 """
 
 import argparse
+import logging
 import sqlite3
 import json
 import sys
-from collections import defaultdict
+from array import array
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import accumulate, compress
 from pathlib import Path
 
-import networkx as nx
+from db_util import bulk_insert
+
+
+log = logging.getLogger(__name__)
+
+# Hot-path statements of find_containing_basic_block. Keeping them as module
+# constants means every call hands sqlite3 the identical string, so each one is
+# prepared once and then served from the connection's statement cache.
+RVA_CACHE_LOOKUP_SQL = """
+    SELECT bb_rva, func_id FROM rva_to_bb_cache
+    WHERE binary_id = ? AND instruction_rva = ?
+"""
+
+# A BB start matches itself; otherwise this is the nearest block at or below the
+# RVA. Served entirely from the idx_bb_cover covering index.
+CONTAINING_BB_SQL = """
+    SELECT bb_rva, func_id, bb_end_va - bb_start_va as bb_size
+    FROM m.basic_blocks
+    WHERE binary_id = ? AND bb_rva <= ?
+    ORDER BY bb_rva DESC
+    LIMIT 1
+"""
+
+RVA_CACHE_INSERT_SQL = "INSERT OR IGNORE INTO rva_to_bb_cache VALUES (?, ?, ?, ?)"
+
+# Upper bound on in-process containing-block answers kept by the observed-edge pass
+RVA_MEMO_LIMIT = 1 << 20
+
+# Statement cache size for the analysis connection; the default of 128 is shared with
+# every per-binary and per-table query issued over the run
+STATEMENT_CACHE_SIZE = 512
+
+
+def iter_set_bits(bits):
+    """Yield the indices of the set bits of a non-negative int, lowest first."""
+    # bin() renders the whole bitset in C; scanning it with str.find avoids
+    # re-allocating the (possibly very wide) int for every set bit
+    digits = bin(bits)[:1:-1]
+    k = digits.find('1')
+    while k != -1:
+        yield k
+        k = digits.find('1', k + 1)
+
+
+def strongly_connected_components(indptr, indices, active):
+    """
+    Label the strongly connected components of the active subgraph.
+
+    Iterative Tarjan over a CSR adjacency. Returns (comp, order): comp[u] is
+    the component id of node u (-1 for inactive nodes) and order lists the
+    active nodes grouped by component in increasing id. Ids come out in
+    reverse topological order, so every edge between two components points
+    from a higher id to a lower one.
+    """
+    node_count = len(indptr) - 1
+    index = array('l', [-1]) * node_count
+    low = array('l', [0]) * node_count
+    comp = array('l', [-1]) * node_count
+    on_stack = bytearray(node_count)
+    stack = []
+    order = []
+    next_index = 0
+    comp_count = 0
+    
+    for root in range(node_count):
+        if not active[root] or index[root] != -1:
+            continue
+        index[root] = low[root] = next_index
+        next_index += 1
+        stack.append(root)
+        on_stack[root] = 1
+        work = [(root, indptr[root])]
+        
+        while work:
+            u, pos = work[-1]
+            end = indptr[u + 1]
+            while pos < end:
+                v = indices[pos]
+                pos += 1
+                if not active[v]:
+                    continue
+                if index[v] == -1:
+                    # Descend into v; resume u's successors at pos afterwards
+                    work[-1] = (u, pos)
+                    index[v] = low[v] = next_index
+                    next_index += 1
+                    stack.append(v)
+                    on_stack[v] = 1
+                    work.append((v, indptr[v]))
+                    break
+                if on_stack[v] and index[v] < low[u]:
+                    low[u] = index[v]
+            else:
+                # All successors of u visited
+                work.pop()
+                if low[u] == index[u]:
+                    while True:
+                        w = stack.pop()
+                        on_stack[w] = 0
+                        comp[w] = comp_count
+                        order.append(w)
+                        if w == u:
+                            break
+                    comp_count += 1
+                if work:
+                    parent = work[-1][0]
+                    if low[u] < low[parent]:
+                        low[parent] = low[u]
+    
+    return comp, order
+
+
+def propagate_bitsets(indptr, indices, reached_by, active):
+    """
+    OR each node's bitset into everything it reaches.
+
+    indptr/indices are a CSR adjacency over dense node ids, reached_by holds one
+    int bitset per node (updated in place) and active is a bytearray mask of the
+    nodes that take part. The active subgraph is condensed into SCCs: all nodes
+    of a cycle share one set, and the condensation DAG is walked once in
+    topological order, so every edge is relaxed exactly once.
+    """
+    comp, order = strongly_connected_components(indptr, indices, active)
+    
+    comp_bits = [0] * (len(order) and comp[order[-1]] + 1)
+    for u in order:
+        comp_bits[comp[u]] |= reached_by[u]
+    
+    # Highest id first is topological order: a component's set is final before
+    # it is pushed to its successors
+    for u in reversed(order):
+        c = comp[u]
+        bits = comp_bits[c]
+        reached_by[u] = bits
+        if not bits:
+            continue
+        for v in indices[indptr[u]:indptr[u + 1]]:
+            if active[v] and comp[v] != c:
+                comp_bits[comp[v]] |= bits
 
 
 def create_analysis_tables(conn):
@@ -34,7 +176,9 @@ def create_analysis_tables(conn):
         )
     """)
 
-    # RVA to basic block mapping cache (for return addresses)
+    # RVA to basic block mapping cache (for return addresses).
+    # Composite-PK tables below are WITHOUT ROWID: the PK B-tree is the table,
+    # so lookups on any PK prefix need no separate index.
     cur.execute("""
         CREATE TABLE IF NOT EXISTS rva_to_bb_cache (
             binary_id INTEGER NOT NULL,
@@ -42,9 +186,8 @@ def create_analysis_tables(conn):
             bb_rva INTEGER NOT NULL,
             func_id INTEGER NOT NULL,
             PRIMARY KEY (binary_id, instruction_rva)
-        )
+        ) WITHOUT ROWID
     """)
-    cur.execute("CREATE INDEX IF NOT EXISTS idx_rva_to_bb_binary ON rva_to_bb_cache(binary_id)")
 
     # Joined coverage tables (use binary_id from master.db)
     cur.execute("""
@@ -54,7 +197,7 @@ def create_analysis_tables(conn):
             bb_rva INTEGER NOT NULL,
             hit_A INTEGER DEFAULT 1,
             PRIMARY KEY (binary_id, bb_rva)
-        )
+        ) WITHOUT ROWID
     """)
 
     cur.execute("""
@@ -64,7 +207,7 @@ def create_analysis_tables(conn):
             bb_rva INTEGER NOT NULL,
             hit_B INTEGER DEFAULT 1,
             PRIMARY KEY (binary_id, bb_rva)
-        )
+        ) WITHOUT ROWID
     """)
 
     # Block labels (diff)
@@ -77,10 +220,8 @@ def create_analysis_tables(conn):
             in_B INTEGER NOT NULL,
             is_new INTEGER NOT NULL,
             PRIMARY KEY (binary_id, bb_rva)
-        )
+        ) WITHOUT ROWID
     """)
-    cur.execute("CREATE INDEX IF NOT EXISTS idx_bb_labels_new ON bb_labels(binary_id, is_new)")
-    cur.execute("CREATE INDEX IF NOT EXISTS idx_bb_labels_binary ON bb_labels(binary_id)")
 
     # Executed graph G_B (all use binary_id)
     cur.execute("""
@@ -91,7 +232,7 @@ def create_analysis_tables(conn):
             is_new INTEGER NOT NULL,
             in_A INTEGER NOT NULL,
             PRIMARY KEY (binary_id, bb_rva)
-        )
+        ) WITHOUT ROWID
     """)
 
     cur.execute("""
@@ -101,11 +242,8 @@ def create_analysis_tables(conn):
             dst_bb_rva INTEGER NOT NULL,
             edge_type TEXT NOT NULL,
             PRIMARY KEY (binary_id, src_bb_rva, dst_bb_rva, edge_type)
-        )
+        ) WITHOUT ROWID
     """)
-    cur.execute("CREATE INDEX IF NOT EXISTS idx_graph_B_edges_src ON graph_B_edges(binary_id, src_bb_rva)")
-    cur.execute("CREATE INDEX IF NOT EXISTS idx_graph_B_edges_dst ON graph_B_edges(binary_id, dst_bb_rva)")
-    cur.execute("CREATE INDEX IF NOT EXISTS idx_graph_B_edges_binary ON graph_B_edges(binary_id)")
 
     # Frontier edges and targets
     cur.execute("""
@@ -115,7 +253,7 @@ def create_analysis_tables(conn):
             dst_bb_rva INTEGER NOT NULL,
             edge_type TEXT NOT NULL,
             PRIMARY KEY (binary_id, src_bb_rva, dst_bb_rva, edge_type)
-        )
+        ) WITHOUT ROWID
     """)
 
     cur.execute("""
@@ -125,7 +263,7 @@ def create_analysis_tables(conn):
             func_id INTEGER NOT NULL,
             frontier_type TEXT NOT NULL,
             PRIMARY KEY (binary_id, bb_rva)
-        )
+        ) WITHOUT ROWID
     """)
 
     # Reachability from frontier blocks to new blocks
@@ -135,10 +273,8 @@ def create_analysis_tables(conn):
             frontier_bb_rva INTEGER NOT NULL,
             new_bb_rva INTEGER NOT NULL,
             PRIMARY KEY (binary_id, frontier_bb_rva, new_bb_rva)
-        )
+        ) WITHOUT ROWID
     """)
-    cur.execute("CREATE INDEX IF NOT EXISTS idx_frontier_reachability_frontier ON frontier_reachability(binary_id, frontier_bb_rva)")
-    cur.execute("CREATE INDEX IF NOT EXISTS idx_frontier_reachability_new ON frontier_reachability(binary_id, new_bb_rva)")
 
     # Attribution results
     cur.execute("""
@@ -150,7 +286,7 @@ def create_analysis_tables(conn):
             shared_new_bb_count INTEGER NOT NULL,
             attributed_new_func_count INTEGER NOT NULL,
             PRIMARY KEY (binary_id, frontier_bb_rva)
-        )
+        ) WITHOUT ROWID
     """)
 
     cur.execute("""
@@ -160,7 +296,7 @@ def create_analysis_tables(conn):
             frontier_bb_rva INTEGER,
             is_shared INTEGER NOT NULL,
             PRIMARY KEY (binary_id, new_bb_rva)
-        )
+        ) WITHOUT ROWID
     """)
 
     # Aggregated scores
@@ -197,63 +333,129 @@ def create_analysis_tables(conn):
     conn.commit()
 
 
-def find_containing_basic_block(master_cur, cov_cur, binary_id, instruction_rva):
+# Secondary indexes on bulk-loaded tables, built by create_analysis_indexes once
+# the table is filled rather than maintained row by row during the load
+ANALYSIS_INDEXES = {
+    'bb_labels': [
+        "CREATE INDEX IF NOT EXISTS idx_bb_labels_new ON bb_labels(binary_id, is_new)",
+    ],
+    'graph_B_edges': [
+        "CREATE INDEX IF NOT EXISTS idx_graph_B_edges_dst ON graph_B_edges(binary_id, dst_bb_rva, edge_type)",
+    ],
+    'frontier_edges': [
+        "CREATE INDEX IF NOT EXISTS idx_frontier_edges_dst ON frontier_edges(binary_id, dst_bb_rva, src_bb_rva, edge_type)",
+    ],
+    'frontier_targets': [],
+    'frontier_reachability': [
+        "CREATE INDEX IF NOT EXISTS idx_frontier_reachability_new ON frontier_reachability(binary_id, new_bb_rva)",
+    ],
+    # PK lookups only, but the scoring joins need their statistics
+    'frontier_attribution': [],
+    'bb_attributed_to': [],
+}
+
+
+def create_analysis_indexes(conn, table):
+    """Build the secondary indexes of a freshly loaded table and refresh its statistics."""
+    cur = conn.cursor()
+    for statement in ANALYSIS_INDEXES[table]:
+        cur.execute(statement)
+    cur.execute(f"ANALYZE {table}")
+
+
+MASTER_INDEXES = {
+    'idx_bb_cover': """
+        CREATE INDEX IF NOT EXISTS idx_bb_cover
+        ON basic_blocks(binary_id, bb_rva, func_id, bb_end_va, bb_start_va)
+    """,
+    # Deterministic-edge detection groups CFG edges by source block; with this
+    # index the GROUP BY streams in index order instead of sorting a temp B-tree
+    'idx_cfg_edges_cover': """
+        CREATE INDEX IF NOT EXISTS idx_cfg_edges_cover
+        ON cfg_edges(binary_id, src_bb_rva, dst_bb_rva, edge_kind)
+    """,
+}
+
+
+def create_master_indexes(master_conn):
+    """
+    Create covering indexes on master.db for the hot basic block and CFG lookups.
+
+    Containing-block range scans, func_id lookups and CFG successor scans are
+    answered from the index alone, without a second fetch into the table row.
+    Runs on a short-lived connection before master.db is attached read-only
+    for the analysis itself. Nothing is written when the indexes already
+    exist; when they are missing and master.db cannot be written (e.g. a
+    shared read-only copy) the analysis runs without them.
+    """
+    cur = master_conn.cursor()
+
+    existing = {row[0] for row in cur.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'index'"
+    )}
+    if existing.issuperset(MASTER_INDEXES):
+        return
+
+    try:
+        for sql in MASTER_INDEXES.values():
+            cur.execute(sql)
+        # Refresh planner statistics for the indexed tables only, so the
+        # covering indexes win over the PK/binary indexes
+        cur.execute("ANALYZE basic_blocks")
+        cur.execute("ANALYZE cfg_edges")
+        master_conn.commit()
+    except sqlite3.OperationalError as e:
+        master_conn.rollback()
+        log.warning("  WARNING: Could not index master.db (%s); continuing without covering indexes", e)
+
+
+def rva_key(binary_id, rva):
+    """Pack a (binary_id, 32-bit rva) pair into one int for dict keys."""
+    return (binary_id << 32) | rva
+
+
+def find_containing_basic_block(cov_cur, binary_id, instruction_rva, memo=None):
     """
     Find the basic block that contains a given instruction RVA.
     This handles return addresses and other mid-block addresses.
+
+    memo, if given, is an OrderedDict keyed by rva_key(binary_id, instruction_rva)
+    used as an LRU: it is consulted before SQLite, filled with every answer
+    (misses included) and capped at RVA_MEMO_LIMIT entries.
     
     Returns: (bb_rva, func_id) or None if not found
     """
+    key = rva_key(binary_id, instruction_rva)
+    if memo is not None:
+        if key in memo:
+            memo.move_to_end(key)
+            return memo[key]
+        if len(memo) >= RVA_MEMO_LIMIT:
+            # Evict the least recently used entry
+            memo.popitem(last=False)
+
     # Check cache first
-    cov_cur.execute(
-        "SELECT bb_rva, func_id FROM rva_to_bb_cache WHERE binary_id = ? AND instruction_rva = ?",
-        (binary_id, instruction_rva)
-    )
+    cov_cur.execute(RVA_CACHE_LOOKUP_SQL, (binary_id, instruction_rva))
     result = cov_cur.fetchone()
-    if result:
-        return result
-    
-    # Try exact match first (instruction_rva is a BB start)
-    master_cur.execute(
-        "SELECT bb_rva, func_id FROM basic_blocks WHERE binary_id = ? AND bb_rva = ?",
-        (binary_id, instruction_rva)
-    )
-    result = master_cur.fetchone()
-    if result:
-        bb_rva, func_id = result
-        # Cache it
-        cov_cur.execute(
-            "INSERT OR IGNORE INTO rva_to_bb_cache VALUES (?, ?, ?, ?)",
-            (binary_id, instruction_rva, bb_rva, func_id)
-        )
-        return (bb_rva, func_id)
-    
-    # Not a BB start - find containing BB using bb_start_va and bb_end_va
-    # instruction_rva should satisfy: bb_rva <= instruction_rva < bb_end_rva
-    master_cur.execute("""
-        SELECT bb_rva, func_id, bb_end_va - bb_start_va as bb_size
-        FROM basic_blocks
-        WHERE binary_id = ? AND bb_rva <= ?
-        ORDER BY bb_rva DESC
-        LIMIT 1
-    """, (binary_id, instruction_rva))
-    result = master_cur.fetchone()
-    
-    if result:
-        bb_rva, func_id, bb_size = result
-        # Verify instruction is within the BB bounds
-        if instruction_rva <= bb_rva + bb_size:
-            # Cache it
-            cov_cur.execute(
-                "INSERT OR IGNORE INTO rva_to_bb_cache VALUES (?, ?, ?, ?)",
-                (binary_id, instruction_rva, bb_rva, func_id)
-            )
-            return (bb_rva, func_id)
-    
-    return None
-
-
-def map_modules_to_binaries(cov_conn, master_conn):
+    if result is None:
+        # Find containing BB using bb_start_va and bb_end_va.
+        # instruction_rva should satisfy: bb_rva <= instruction_rva <= bb_end_rva
+        cov_cur.execute(CONTAINING_BB_SQL, (binary_id, instruction_rva))
+        row = cov_cur.fetchone()
+        if row:
+            bb_rva, func_id, bb_size = row
+            # Verify instruction is within the BB bounds
+            if instruction_rva <= bb_rva + bb_size:
+                # Cache it
+                cov_cur.execute(RVA_CACHE_INSERT_SQL, (binary_id, instruction_rva, bb_rva, func_id))
+                result = (bb_rva, func_id)
+
+    if memo is not None:
+        memo[key] = result
+    return result
+
+
+def map_modules_to_binaries(cov_conn):
     """
     Create module to binary mapping via SHA256 hash.
 
@@ -263,61 +465,48 @@ def map_modules_to_binaries(cov_conn, master_conn):
     print("Step 1: Mapping modules to binaries via SHA256...")
 
     cov_cur = cov_conn.cursor()
-    master_cur = master_conn.cursor()
 
-    # Get all modules from coverage DB
-    cov_cur.execute("SELECT id, name, sha256_hash FROM modules")
-    modules = cov_cur.fetchall()
-
-    mapping = []
-    unmapped = []
-
-    for module_id, module_name, sha256_hash in modules:
-        # Find matching binary in master DB by SHA256
-        master_cur.execute(
-            "SELECT binary_id, binary_name FROM analyzed_binaries WHERE sha256_hash = ?",
-            (sha256_hash,)
-        )
-        result = master_cur.fetchone()
+    # Single cross-database join; analyzed_binaries.sha256_hash is UNIQUE, so
+    # the lookup side is already indexed
+    with cov_conn:
+        cov_cur.execute("""
+            INSERT OR REPLACE INTO module_binary_map (module_id, binary_id, module_name, binary_name, sha256_hash)
+            SELECT mo.id, ab.binary_id, mo.name, ab.binary_name, mo.sha256_hash
+            FROM modules mo
+            JOIN m.analyzed_binaries ab ON ab.sha256_hash = mo.sha256_hash
+        """)
+        mapped_count = cov_cur.rowcount
 
-        if result:
-            binary_id, binary_name = result
-            mapping.append((module_id, binary_id, module_name, binary_name, sha256_hash))
-            print(f"  Mapped module_id={module_id} ({module_name}) -> binary_id={binary_id} ({binary_name})")
-        else:
-            unmapped.append((module_id, module_name, sha256_hash))
-            print(f"  WARNING: No binary found for module_id={module_id} ({module_name}, {sha256_hash})")
-
-    # Insert mapping
-    if mapping:
-        cov_cur.executemany(
-            "INSERT OR REPLACE INTO module_binary_map (module_id, binary_id, module_name, binary_name, sha256_hash) VALUES (?, ?, ?, ?, ?)",
-            mapping
-        )
-        cov_conn.commit()
+    cov_cur.execute("""
+        SELECT id, name, sha256_hash
+        FROM modules
+        WHERE sha256_hash NOT IN (SELECT sha256_hash FROM m.analyzed_binaries)
+    """)
+    unmapped = cov_cur.fetchall()
+    for module_id, module_name, sha256_hash in unmapped:
+        log.warning("  WARNING: No binary found for module_id=%s (%s, %s)", module_id, module_name, sha256_hash)
 
-    print(f"  Successfully mapped {len(mapping)} modules to binaries")
+    print(f"  Successfully mapped {mapped_count} modules to binaries")
     if unmapped:
         print(f"  WARNING: {len(unmapped)} modules could not be mapped")
 
-    return len(mapping), unmapped
+    return mapped_count, unmapped
 
 
-def join_coverage_to_blocks(cov_conn, master_conn, sample_name, blocks_table, edges_table=None):
+def join_coverage_to_blocks(cov_conn, sample_name, blocks_table, edges_table=None):
     """
     Join coverage data to basic blocks.
     
     IMPORTANT: Handles return addresses by mapping them to their containing basic blocks.
+
+    All coverage entries are staged in a TEMP table and resolved with a single
+    set-based join against the attached master database (schema "m"), instead
+    of one find_containing_basic_block() round-trip per entry.
     """
     print(f"Step 2: Joining coverage {sample_name} to basic blocks...")
 
     cov_cur = cov_conn.cursor()
-    master_cur = master_conn.cursor()
 
-    missing_blocks = []
-    joined_data = []
-    processed_blocks = set()
-    
     stats = {
         'direct_blocks': 0,
         'edge_src_blocks': 0,
@@ -326,57 +515,100 @@ def join_coverage_to_blocks(cov_conn, master_conn, sample_name, blocks_table, ed
         'unmapped': 0
     }
 
-    # Get coverage blocks with module_id
-    cov_cur.execute(f"SELECT module_id, bb_rva FROM {blocks_table}")
-    coverage_blocks = cov_cur.fetchall()
-    stats['direct_blocks'] = len(coverage_blocks)
-
-    # Also get blocks from edges (both conditional branches and return address edges)
+    # Count coverage entries (edges contribute both endpoints)
+    stats['direct_blocks'] = cov_cur.execute(f"SELECT COUNT(*) FROM {blocks_table}").fetchone()[0]
     if edges_table:
-        cov_cur.execute(f"SELECT module_id, src_bb_rva, dst_bb_rva FROM {edges_table}")
-        for module_id, src_rva, dst_rva in cov_cur.fetchall():
-            coverage_blocks.append((module_id, src_rva))
-            coverage_blocks.append((module_id, dst_rva))
-            stats['edge_src_blocks'] += 1
-            stats['edge_dst_blocks'] += 1
-
-    print(f"  Processing {len(coverage_blocks)} coverage entries...")
+        edge_count = cov_cur.execute(f"SELECT COUNT(*) FROM {edges_table}").fetchone()[0]
+        stats['edge_src_blocks'] = edge_count
+        stats['edge_dst_blocks'] = edge_count
+    total_entries = stats['direct_blocks'] + stats['edge_src_blocks'] + stats['edge_dst_blocks']
+
+    print(f"  Processing {total_entries} coverage entries...")
     print(f"    Direct blocks: {stats['direct_blocks']}")
     print(f"    Edge sources: {stats['edge_src_blocks']}")
     print(f"    Edge destinations: {stats['edge_dst_blocks']}")
 
-    for module_id, instruction_rva in coverage_blocks:
-        # Skip if already processed
-        block_key = (module_id, instruction_rva)
-        if block_key in processed_blocks:
-            continue
-        processed_blocks.add(block_key)
-        
-        # Map module_id -> binary_id
-        cov_cur.execute("SELECT binary_id FROM module_binary_map WHERE module_id = ?", (module_id,))
-        result = cov_cur.fetchone()
+    # Stage unique (module_id, instruction_rva) pairs; the PK does the dedup
+    cov_cur.execute("DROP TABLE IF EXISTS temp.cov_probe")
+    cov_cur.execute("""
+        CREATE TEMP TABLE cov_probe (
+            module_id INTEGER NOT NULL,
+            instruction_rva INTEGER NOT NULL,
+            PRIMARY KEY (module_id, instruction_rva)
+        ) WITHOUT ROWID
+    """)
+    with cov_conn:
+        # Blocks and both edge endpoints (conditional branches and return address edges)
+        cov_cur.execute(f"""
+            INSERT OR IGNORE INTO cov_probe (module_id, instruction_rva)
+            SELECT module_id, bb_rva FROM {blocks_table}
+        """)
+        if edges_table:
+            cov_cur.execute(f"""
+                INSERT OR IGNORE INTO cov_probe (module_id, instruction_rva)
+                SELECT module_id, src_bb_rva FROM {edges_table}
+                UNION ALL
+                SELECT module_id, dst_bb_rva FROM {edges_table}
+            """)
+
+        # Resolve every probe to its containing basic block in one pass.
+        # The containing BB is the one with the greatest bb_rva <= instruction_rva,
+        # provided the instruction falls within its bounds (bb_end_va is inclusive).
+        cov_cur.execute("DROP TABLE IF EXISTS temp.cov_resolved")
+        cov_cur.execute("""
+            CREATE TEMP TABLE cov_resolved AS
+            SELECT p.module_id, p.instruction_rva, mbm.binary_id, bb.bb_rva, bb.func_id
+            FROM cov_probe p
+            LEFT JOIN module_binary_map mbm ON mbm.module_id = p.module_id
+            LEFT JOIN m.basic_blocks bb
+              ON bb.binary_id = mbm.binary_id
+             AND bb.bb_rva = (
+                 SELECT bb2.bb_rva
+                 FROM m.basic_blocks bb2
+                 WHERE bb2.binary_id = mbm.binary_id AND bb2.bb_rva <= p.instruction_rva
+                 ORDER BY bb2.bb_rva DESC
+                 LIMIT 1
+             )
+             AND p.instruction_rva <= bb.bb_rva + (bb.bb_end_va - bb.bb_start_va)
+        """)
+
+        # Insert joined data
+        target_table = f"cov_{sample_name}_blocks_joined"
+        cov_cur.execute(f"""
+            INSERT OR IGNORE INTO {target_table} (binary_id, func_id, bb_rva)
+            SELECT binary_id, func_id, bb_rva
+            FROM cov_resolved
+            WHERE bb_rva IS NOT NULL
+        """)
 
-        if not result:
+        # Persist the resolved addresses; build_executed_graph primes its
+        # observed-edge memo from this cache
+        cov_cur.execute("""
+            INSERT OR IGNORE INTO rva_to_bb_cache (binary_id, instruction_rva, bb_rva, func_id)
+            SELECT binary_id, instruction_rva, bb_rva, func_id
+            FROM cov_resolved
+            WHERE bb_rva IS NOT NULL
+        """)
+
+    joined_count, stats['return_addresses_mapped'] = cov_cur.execute("""
+        SELECT COUNT(*), COALESCE(SUM(bb_rva != instruction_rva), 0)
+        FROM cov_resolved
+        WHERE bb_rva IS NOT NULL
+    """).fetchone()
+
+    missing_blocks = []
+    cov_cur.execute("""
+        SELECT module_id, binary_id, instruction_rva
+        FROM cov_resolved
+        WHERE bb_rva IS NULL
+    """)
+    for module_id, binary_id, instruction_rva in cov_cur.fetchall():
+        if binary_id is None:
             missing_blocks.append({
                 'module_id': module_id,
                 'instruction_rva': instruction_rva,
                 'reason': 'module_not_mapped'
             })
-            stats['unmapped'] += 1
-            continue
-
-        binary_id = result[0]
-
-        # Find the containing basic block (handles both BB starts and return addresses)
-        result = find_containing_basic_block(master_cur, cov_cur, binary_id, instruction_rva)
-        
-        if result:
-            bb_rva, func_id = result
-            joined_data.append((binary_id, func_id, bb_rva))
-            
-            # Track if we mapped a return address
-            if bb_rva != instruction_rva:
-                stats['return_addresses_mapped'] += 1
         else:
             missing_blocks.append({
                 'module_id': module_id,
@@ -384,17 +616,12 @@ def join_coverage_to_blocks(cov_conn, master_conn, sample_name, blocks_table, ed
                 'instruction_rva': instruction_rva,
                 'reason': 'not_found_in_static_analysis'
             })
-            stats['unmapped'] += 1
+    stats['unmapped'] = len(missing_blocks)
 
-    # Insert joined data
-    target_table = f"cov_{sample_name}_blocks_joined"
-    cov_cur.executemany(
-        f"INSERT OR IGNORE INTO {target_table} (binary_id, func_id, bb_rva) VALUES (?, ?, ?)",
-        joined_data
-    )
-    cov_conn.commit()
+    cov_cur.execute("DROP TABLE temp.cov_probe")
+    cov_cur.execute("DROP TABLE temp.cov_resolved")
 
-    print(f"  Joined {len(joined_data)} unique blocks")
+    print(f"  Joined {joined_count} unique blocks")
     print(f"    Return addresses mapped to BBs: {stats['return_addresses_mapped']}")
     print(f"    Missing/unmapped: {len(missing_blocks)}")
     
@@ -407,33 +634,33 @@ def compute_diff_labels(cov_conn):
 
     cur = cov_conn.cursor()
 
-    cur.execute("""
-        INSERT INTO bb_labels (binary_id, func_id, bb_rva, in_A, in_B, is_new)
-        SELECT 
-            binary_id,
-            func_id,
-            bb_rva,
-            MAX(in_A) as in_A,
-            MAX(in_B) as in_B,
-            CASE WHEN MAX(in_B) = 1 AND MAX(in_A) = 0 THEN 1 ELSE 0 END as is_new
-        FROM (
-            SELECT binary_id, func_id, bb_rva, 1 as in_A, 0 as in_B
-            FROM cov_A_blocks_joined
-            UNION ALL
-            SELECT binary_id, func_id, bb_rva, 0 as in_A, 1 as in_B
-            FROM cov_B_blocks_joined
-        )
-        GROUP BY binary_id, bb_rva
-    """)
-
-    cov_conn.commit()
+    with cov_conn:
+        # Full outer join of the two samples as two PK-ordered halves: every A block
+        # with its B match, then the B-only blocks. No UNION/GROUP BY sort needed.
+        cur.execute("""
+            INSERT INTO bb_labels (binary_id, func_id, bb_rva, in_A, in_B, is_new)
+            SELECT a.binary_id, a.func_id, a.bb_rva, 1, b.bb_rva IS NOT NULL, 0
+            FROM cov_A_blocks_joined a
+            LEFT JOIN cov_B_blocks_joined b
+              ON b.binary_id = a.binary_id AND b.bb_rva = a.bb_rva
+        """)
+        cur.execute("""
+            INSERT INTO bb_labels (binary_id, func_id, bb_rva, in_A, in_B, is_new)
+            SELECT b.binary_id, b.func_id, b.bb_rva, 0, 1, 1
+            FROM cov_B_blocks_joined b
+            WHERE NOT EXISTS (
+                SELECT 1 FROM cov_A_blocks_joined a
+                WHERE a.binary_id = b.binary_id AND a.bb_rva = b.bb_rva
+            )
+        """)
+        create_analysis_indexes(cov_conn, 'bb_labels')
 
     count = cur.execute("SELECT COUNT(*) FROM bb_labels WHERE is_new = 1").fetchone()[0]
     print(f"  Found {count} new blocks in B")
     return count
 
 
-def expand_deterministic_for_sample(cov_conn, master_conn, sample_name):
+def expand_deterministic_for_sample(cov_conn, sample_name):
     """
     Expand deterministic paths for a specific sample (A or B).
     
@@ -446,97 +673,64 @@ def expand_deterministic_for_sample(cov_conn, master_conn, sample_name):
     - Another covered block
     - A block with multiple successors (conditional branch - non-deterministic)
     - End of path
+
+    The walk is a single recursive CTE evaluated inside SQLite.
     """
     print(f"Expanding deterministic paths for sample {sample_name}...")
     
     cov_cur = cov_conn.cursor()
-    master_cur = master_conn.cursor()
     
     source_table = f'cov_{sample_name}_blocks_joined'
     
-    # Get all binaries in this sample
-    binaries = cov_cur.execute(f"SELECT DISTINCT binary_id FROM {source_table}").fetchall()
-    
-    total_added = 0
+    # Deterministic = single successor that is fallthrough or unconditional branch
+    cov_cur.execute("DROP TABLE IF EXISTS temp.det_edges")
+    cov_cur.execute("""
+        CREATE TEMP TABLE det_edges (
+            binary_id INTEGER NOT NULL,
+            src_bb_rva INTEGER NOT NULL,
+            dst_bb_rva INTEGER NOT NULL,
+            PRIMARY KEY (binary_id, src_bb_rva)
+        ) WITHOUT ROWID
+    """)
     
-    for (binary_id,) in binaries:
-        print(f"  Processing binary {binary_id}...")
-        
-        # Get all blocks currently in this sample's coverage
-        cov_cur.execute(f"SELECT bb_rva FROM {source_table} WHERE binary_id = ?", (binary_id,))
-        covered_blocks = set(row[0] for row in cov_cur.fetchall())
-        
-        # Build CFG with edge types
-        master_cur.execute("""
-            SELECT src_bb_rva, dst_bb_rva, edge_kind
-            FROM cfg_edges
-            WHERE binary_id = ?
-        """, (binary_id,))
-        
-        # Group by source to identify deterministic blocks
-        from collections import defaultdict
-        cfg = defaultdict(list)  # src -> [(dst, kind), ...]
-        for src, dst, kind in master_cur.fetchall():
-            cfg[src].append((dst, kind if kind else 'unknown'))
-        
-        # For each covered block, follow deterministic edges to find intermediates
-        newly_discovered = set()
-        
-        for start_bb in covered_blocks:
-            from collections import deque
-            queue = deque([start_bb])
-            visited_from_start = {start_bb}
-            
-            while queue:
-                current = queue.popleft()
-                
-                if current not in cfg:
-                    continue
-                
-                successors = cfg[current]
-                
-                # Deterministic = single successor that is fallthrough or unconditional branch
-                if len(successors) == 1:
-                    dst, kind = successors[0]
-                    if kind in ('fallthrough', 'branch_unconditional'):
-                        if dst not in visited_from_start:
-                            visited_from_start.add(dst)
-                            
-                            # If dst is not yet covered, it's an intermediate block
-                            if dst not in covered_blocks:
-                                newly_discovered.add(dst)
-                                # Continue traversing
-                                queue.append(dst)
-                            # If dst is covered, stop - let that block handle its expansion
+    with cov_conn:
+        cov_cur.execute(f"""
+            INSERT INTO det_edges (binary_id, src_bb_rva, dst_bb_rva)
+            SELECT binary_id, src_bb_rva, MAX(dst_bb_rva)
+            FROM m.cfg_edges
+            WHERE binary_id IN (SELECT DISTINCT binary_id FROM {source_table})
+            GROUP BY binary_id, src_bb_rva
+            HAVING COUNT(*) = 1
+               AND MAX(edge_kind) IN ('fallthrough', 'branch_unconditional')
+        """)
         
-        # Add newly discovered blocks to this sample's coverage table
-        if newly_discovered:
-            blocks_to_add = []
-            for bb_rva in newly_discovered:
-                # Look up func_id
-                master_cur.execute(
-                    "SELECT func_id FROM basic_blocks WHERE binary_id = ? AND bb_rva = ?",
-                    (binary_id, bb_rva)
-                )
-                result = master_cur.fetchone()
-                
-                if result:
-                    func_id = result[0]
-                    blocks_to_add.append((binary_id, func_id, bb_rva))
-            
-            if blocks_to_add:
-                cov_cur.executemany(
-                    f"INSERT OR IGNORE INTO {source_table} (binary_id, func_id, bb_rva) VALUES (?, ?, ?)",
-                    blocks_to_add
+        # Walk from every covered block; stop at blocks that are already covered
+        # (they seed their own walk). Blocks unknown to master.db are traversed
+        # but not added, since they have no func_id.
+        cov_cur.execute(f"""
+            INSERT OR IGNORE INTO {source_table} (binary_id, func_id, bb_rva)
+            WITH RECURSIVE walk(binary_id, bb_rva) AS (
+                SELECT binary_id, bb_rva FROM {source_table}
+                UNION
+                SELECT d.binary_id, d.dst_bb_rva
+                FROM walk w
+                JOIN det_edges d ON d.binary_id = w.binary_id AND d.src_bb_rva = w.bb_rva
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM {source_table} c
+                    WHERE c.binary_id = d.binary_id AND c.bb_rva = d.dst_bb_rva
                 )
-                total_added += len(blocks_to_add)
-                print(f"    Added {len(blocks_to_add)} intermediate blocks")
+            )
+            SELECT w.binary_id, bb.func_id, w.bb_rva
+            FROM walk w
+            JOIN m.basic_blocks bb ON bb.binary_id = w.binary_id AND bb.bb_rva = w.bb_rva
+        """)
+        total_added = cov_cur.rowcount
     
-    cov_conn.commit()
+    cov_cur.execute("DROP TABLE temp.det_edges")
     print(f"  Total intermediate blocks added for sample {sample_name}: {total_added}")
 
 
-def build_executed_graph(cov_conn, master_conn, edges_B_table):
+def build_executed_graph(cov_conn, edges_B_table):
     """
     Build G_B: executed graph restricted to B-covered nodes.
     IMPORTANT: Maps edge endpoints (including return addresses) to their containing BBs.
@@ -544,158 +738,188 @@ def build_executed_graph(cov_conn, master_conn, edges_B_table):
     print("Step 4: Building executed graph G_B...")
 
     cov_cur = cov_conn.cursor()
-    master_cur = master_conn.cursor()
-
-    # Insert nodes (all B-covered blocks)
-    cov_cur.execute("""
-        INSERT INTO graph_B_nodes (binary_id, bb_rva, func_id, is_new, in_A)
-        SELECT binary_id, bb_rva, func_id, is_new, in_A
-        FROM bb_labels
-        WHERE in_B = 1
-    """)
 
-    # Add super-root node for each binary
-    cov_cur.execute("""
-        INSERT INTO graph_B_nodes (binary_id, bb_rva, func_id, is_new, in_A)
-        SELECT DISTINCT binary_id, -1, -1, 0, 1
-        FROM bb_labels
-    """)
-
-    # Add super-root edges to all A-covered blocks
-    cov_cur.execute("""
-        INSERT INTO graph_B_edges (binary_id, src_bb_rva, dst_bb_rva, edge_type)
-        SELECT binary_id, -1, bb_rva, 'super_root'
-        FROM bb_labels
-        WHERE in_A = 1
-    """)
+    with cov_conn:
+        # Insert nodes (all B-covered blocks)
+        cov_cur.execute("""
+            INSERT INTO graph_B_nodes (binary_id, bb_rva, func_id, is_new, in_A)
+            SELECT binary_id, bb_rva, func_id, is_new, in_A
+            FROM bb_labels
+            WHERE in_B = 1
+        """)
 
-    # Create index of B-covered nodes
-    cov_cur.execute("SELECT binary_id, bb_rva FROM graph_B_nodes WHERE bb_rva != -1")
-    b_nodes = set(cov_cur.fetchall())
-    print(f"  Graph has {len(b_nodes)} B-covered nodes")
-
-    # Process each binary separately
-    binaries = cov_cur.execute("SELECT DISTINCT binary_id FROM bb_labels").fetchall()
-    print(f"  Processing {len(binaries)} binaries...")
-
-    for (binary_id,) in binaries:
-        # Add deterministic CFG edges (fallthrough & unconditional branches)
-        master_cur.execute("""
-            SELECT src_bb_rva, dst_bb_rva, COALESCE(edge_kind, 'cfg') 
-            FROM cfg_edges 
-            WHERE binary_id = ?
-              AND edge_kind IN ('fallthrough', 'branch_unconditional')
-        """, (binary_id,))
-
-        cfg_edges = []
-        for src, dst, kind in master_cur.fetchall():
-            if (binary_id, src) in b_nodes and (binary_id, dst) in b_nodes:
-                cfg_edges.append((binary_id, src, dst, f'cfg_{kind}'))
-
-        if cfg_edges:
-            cov_cur.executemany(
-                "INSERT OR IGNORE INTO graph_B_edges VALUES (?, ?, ?, ?)",
-                cfg_edges
-            )
-        print(f"    Binary {binary_id}: Added {len(cfg_edges)} deterministic CFG edges")
-
-        # Add direct call edges from master.db
-        master_cur.execute("""
-            SELECT src_bb_rva, dst_func_id 
-            FROM call_edges_static 
-            WHERE binary_id = ? AND dst_func_id IS NOT NULL
-        """, (binary_id,))
-
-        call_edges = []
-        for src_rva, dst_func_id in master_cur.fetchall():
-            master_cur.execute(
-                "SELECT entry_rva FROM functions WHERE binary_id = ? AND func_id = ?", 
-                (binary_id, dst_func_id)
-            )
-            result = master_cur.fetchone()
-            if result:
-                dst_rva = result[0]
-                if (binary_id, src_rva) in b_nodes and (binary_id, dst_rva) in b_nodes:
-                    call_edges.append((binary_id, src_rva, dst_rva, 'call_direct'))
-
-        if call_edges:
-            cov_cur.executemany(
-                "INSERT OR IGNORE INTO graph_B_edges VALUES (?, ?, ?, ?)",
-                call_edges
-            )
-        print(f"    Binary {binary_id}: Added {len(call_edges)} call edges")
+        # Add super-root node for each binary
+        cov_cur.execute("""
+            INSERT INTO graph_B_nodes (binary_id, bb_rva, func_id, is_new, in_A)
+            SELECT DISTINCT binary_id, -1, -1, 0, 1
+            FROM bb_labels
+        """)
 
-    # Add observed edges from coverage B (conditional branches + return address edges)
-    # CRITICAL: Map both endpoints to their containing basic blocks
-    if edges_B_table:
-        cov_cur.execute(f"""
-            SELECT m.binary_id, e.src_bb_rva, e.dst_bb_rva
-            FROM {edges_B_table} e
-            JOIN module_binary_map m ON e.module_id = m.module_id
+        # Add super-root edges to all A-covered blocks
+        cov_cur.execute("""
+            INSERT INTO graph_B_edges (binary_id, src_bb_rva, dst_bb_rva, edge_type)
+            SELECT binary_id, -1, bb_rva, 'super_root'
+            FROM bb_labels
+            WHERE in_A = 1
         """)
-        
-        observed_edges = []
-        mapped_edges = 0
-        skipped_edges = 0
-        
-        for binary_id, src_instruction_rva, dst_instruction_rva in cov_cur.fetchall():
-            # Map both endpoints to their containing basic blocks
-            src_result = find_containing_basic_block(master_cur, cov_cur, binary_id, src_instruction_rva)
-            dst_result = find_containing_basic_block(master_cur, cov_cur, binary_id, dst_instruction_rva)
-            
-            if src_result and dst_result:
-                src_bb_rva, _ = src_result
-                dst_bb_rva, _ = dst_result
-                
-                # Verify both BBs exist in G_B
-                if (binary_id, src_bb_rva) in b_nodes and (binary_id, dst_bb_rva) in b_nodes:
-                    # Determine edge type based on whether we mapped a return address
-                    if src_instruction_rva != src_bb_rva:
-                        edge_type = 'observed_return_continuation'
-                    else:
-                        edge_type = 'observed_conditional'
-                    
-                    observed_edges.append((binary_id, src_bb_rva, dst_bb_rva, edge_type))
-                    mapped_edges += 1
-                else:
-                    skipped_edges += 1
-            else:
-                skipped_edges += 1
-        
-        if observed_edges:
-            cov_cur.executemany(
-                "INSERT OR IGNORE INTO graph_B_edges VALUES (?, ?, ?, ?)",
-                observed_edges
-            )
-        
-        print(f"  Added {len(observed_edges)} observed edges from coverage")
-        print(f"    Successfully mapped: {mapped_edges}")
-        print(f"    Skipped (endpoints not in G_B): {skipped_edges}")
 
-    # NEW: Add super-root edges to orphaned new blocks (entry points)
-    print("  Finding orphaned new blocks (indirect calls, callbacks)...")
-    cov_cur.execute("""
-        INSERT INTO graph_B_edges (binary_id, src_bb_rva, dst_bb_rva, edge_type)
-        SELECT DISTINCT bb.binary_id, -1, bb.bb_rva, 'super_root_orphan'
-        FROM bb_labels bb
-        WHERE bb.is_new = 1
-          AND bb.bb_rva NOT IN (
-              -- Exclude blocks that have incoming edges from any block
-              SELECT DISTINCT dst_bb_rva 
-              FROM graph_B_edges e
-              WHERE e.binary_id = bb.binary_id 
-                AND e.edge_type != 'super_root'
-                AND e.edge_type != 'super_root_orphan'
-          )
-    """)
+        # Index B-covered nodes in a TEMP table so edge filtering is a SQL join
+        cov_cur.execute("DROP TABLE IF EXISTS temp.b_nodes_tmp")
+        cov_cur.execute("""
+            CREATE TEMP TABLE b_nodes_tmp (
+                binary_id INTEGER NOT NULL,
+                bb_rva INTEGER NOT NULL,
+                PRIMARY KEY (binary_id, bb_rva)
+            ) WITHOUT ROWID
+        """)
+        cov_cur.execute("""
+            INSERT INTO b_nodes_tmp (binary_id, bb_rva)
+            SELECT binary_id, bb_rva FROM graph_B_nodes WHERE bb_rva != -1
+        """)
+        print(f"  Graph has {cov_cur.rowcount} B-covered nodes")
+
+        # Process each binary separately
+        binaries = cov_cur.execute("SELECT DISTINCT binary_id FROM bb_labels").fetchall()
+        print(f"  Processing {len(binaries)} binaries...")
+
+        for (binary_id,) in binaries:
+            # Add deterministic CFG edges (fallthrough & unconditional branches)
+            cov_cur.execute("""
+                INSERT OR IGNORE INTO graph_B_edges (binary_id, src_bb_rva, dst_bb_rva, edge_type)
+                SELECT ce.binary_id, ce.src_bb_rva, ce.dst_bb_rva, 'cfg_' || ce.edge_kind
+                FROM m.cfg_edges ce
+                JOIN b_nodes_tmp s ON s.binary_id = ce.binary_id AND s.bb_rva = ce.src_bb_rva
+                JOIN b_nodes_tmp d ON d.binary_id = ce.binary_id AND d.bb_rva = ce.dst_bb_rva
+                WHERE ce.binary_id = ?
+                  AND ce.edge_kind IN ('fallthrough', 'branch_unconditional')
+            """, (binary_id,))
+            log.debug("    Binary %s: Added %s deterministic CFG edges", binary_id, cov_cur.rowcount)
+
+            # Add direct call edges from master.db, resolving the callee's entry
+            # block through the functions primary key
+            cov_cur.execute("""
+                INSERT OR IGNORE INTO graph_B_edges (binary_id, src_bb_rva, dst_bb_rva, edge_type)
+                SELECT ce.binary_id, ce.src_bb_rva, f.entry_rva, 'call_direct'
+                FROM m.call_edges_static ce
+                JOIN m.functions f ON f.binary_id = ce.binary_id AND f.func_id = ce.dst_func_id
+                JOIN b_nodes_tmp s ON s.binary_id = ce.binary_id AND s.bb_rva = ce.src_bb_rva
+                JOIN b_nodes_tmp d ON d.binary_id = ce.binary_id AND d.bb_rva = f.entry_rva
+                WHERE ce.binary_id = ? AND ce.dst_func_id IS NOT NULL
+            """, (binary_id,))
+            log.debug("    Binary %s: Added %s call edges", binary_id, cov_cur.rowcount)
+
+        # Add observed edges from coverage B (conditional branches + return address edges)
+        # CRITICAL: Map both endpoints to their containing basic blocks
+        if edges_B_table:
+            observed_total = cov_cur.execute(f"""
+                SELECT COUNT(*)
+                FROM {edges_B_table} e
+                JOIN module_binary_map m ON e.module_id = m.module_id
+            """).fetchone()[0]
+
+            # Return addresses repeat heavily; answer repeats from an LRU primed
+            # with rva_to_bb_cache (which join_coverage_to_blocks filled with every
+            # resolved coverage address, edge endpoints included) instead of
+            # querying SQLite. Keys are packed ints: no tuple allocation or tuple
+            # hashing per probe. The cache has no recency information, so it is
+            # only primed when it fits whole; a larger cache would just have an
+            # arbitrary PK-ordered slice of it evicted by the first misses.
+            rva_memo = OrderedDict()
+            cache_rows = cov_cur.execute("SELECT COUNT(*) FROM rva_to_bb_cache").fetchone()[0]
+            if cache_rows <= RVA_MEMO_LIMIT:
+                rva_memo.update(
+                    (rva_key(binary_id, instruction_rva), (bb_rva, func_id))
+                    for binary_id, instruction_rva, bb_rva, func_id in cov_cur.execute(
+                        "SELECT binary_id, instruction_rva, bb_rva, func_id FROM rva_to_bb_cache"
+                    )
+                )
 
-    orphan_count = cov_cur.execute("""
-        SELECT COUNT(*) FROM graph_B_edges 
-        WHERE edge_type = 'super_root_orphan'
-    """).fetchone()[0]
-    print(f"  Added {orphan_count} super-root edges to orphaned new blocks")
+            def resolve_observed_edges():
+                # Iterate on a dedicated cursor: cov_cur is busy writing the
+                # rva_to_bb_cache rows while the staged inserts pull from here
+                read_cur = cov_conn.cursor()
+                read_cur.execute(f"""
+                    SELECT m.binary_id, e.src_bb_rva, e.dst_bb_rva
+                    FROM {edges_B_table} e
+                    JOIN module_binary_map m ON e.module_id = m.module_id
+                """)
+                for binary_id, src_instruction_rva, dst_instruction_rva in read_cur:
+                    # Map both endpoints to their containing basic blocks
+                    src_result = find_containing_basic_block(cov_cur, binary_id, src_instruction_rva, rva_memo)
+                    dst_result = find_containing_basic_block(cov_cur, binary_id, dst_instruction_rva, rva_memo)
+
+                    if src_result and dst_result:
+                        src_bb_rva, _ = src_result
+                        dst_bb_rva, _ = dst_result
+
+                        # Determine edge type based on whether we mapped a return address
+                        if src_instruction_rva != src_bb_rva:
+                            edge_type = 'observed_return_continuation'
+                        else:
+                            edge_type = 'observed_conditional'
+
+                        yield (binary_id, src_bb_rva, dst_bb_rva, edge_type)
+                read_cur.close()
+
+            # Stage the resolved edges, then keep only those whose endpoints are B-covered
+            cov_cur.execute("DROP TABLE IF EXISTS temp.staged_edges")
+            cov_cur.execute("""
+                CREATE TEMP TABLE staged_edges (
+                    binary_id INTEGER NOT NULL,
+                    src_bb_rva INTEGER NOT NULL,
+                    dst_bb_rva INTEGER NOT NULL,
+                    edge_type TEXT NOT NULL
+                )
+            """)
+            bulk_insert(cov_conn.cursor(), "INSERT INTO staged_edges", 4, resolve_observed_edges())
+
+            # Verify both BBs exist in G_B
+            mapped_edges = cov_cur.execute("""
+                SELECT COUNT(*)
+                FROM staged_edges se
+                JOIN b_nodes_tmp s ON s.binary_id = se.binary_id AND s.bb_rva = se.src_bb_rva
+                JOIN b_nodes_tmp d ON d.binary_id = se.binary_id AND d.bb_rva = se.dst_bb_rva
+            """).fetchone()[0]
+            skipped_edges = observed_total - mapped_edges
+            cov_cur.execute("""
+                INSERT OR IGNORE INTO graph_B_edges (binary_id, src_bb_rva, dst_bb_rva, edge_type)
+                SELECT se.binary_id, se.src_bb_rva, se.dst_bb_rva, se.edge_type
+                FROM staged_edges se
+                JOIN b_nodes_tmp s ON s.binary_id = se.binary_id AND s.bb_rva = se.src_bb_rva
+                JOIN b_nodes_tmp d ON d.binary_id = se.binary_id AND d.bb_rva = se.dst_bb_rva
+            """)
+            cov_cur.execute("DROP TABLE temp.staged_edges")
+        
+            print(f"  Added {mapped_edges} observed edges from coverage")
+            print(f"    Successfully mapped: {mapped_edges}")
+            print(f"    Skipped (endpoints not in G_B): {skipped_edges}")
+
+        cov_cur.execute("DROP TABLE temp.b_nodes_tmp")
+
+        # NEW: Add super-root edges to orphaned new blocks (entry points)
+        print("  Finding orphaned new blocks (indirect calls, callbacks)...")
+        # All bulk edge loads are done; index incoming edges for the anti-join
+        create_analysis_indexes(cov_conn, 'graph_B_edges')
+        cov_cur.execute("""
+            INSERT INTO graph_B_edges (binary_id, src_bb_rva, dst_bb_rva, edge_type)
+            SELECT bb.binary_id, -1, bb.bb_rva, 'super_root_orphan'
+            FROM bb_labels bb
+            WHERE bb.is_new = 1
+              AND NOT EXISTS (
+                  -- Exclude blocks that have incoming edges from any block
+                  SELECT 1
+                  FROM graph_B_edges e
+                  WHERE e.binary_id = bb.binary_id
+                    AND e.dst_bb_rva = bb.bb_rva
+                    AND e.edge_type NOT LIKE 'super_root%'
+              )
+        """)
 
-    cov_conn.commit()
+        orphan_count = cov_cur.execute("""
+            SELECT COUNT(*) FROM graph_B_edges 
+            WHERE edge_type = 'super_root_orphan'
+        """).fetchone()[0]
+        print(f"  Added {orphan_count} super-root edges to orphaned new blocks")
 
     node_count = cov_cur.execute("SELECT COUNT(*) FROM graph_B_nodes").fetchone()[0]
     edge_count = cov_cur.execute("SELECT COUNT(*) FROM graph_B_edges").fetchone()[0]
@@ -708,338 +932,406 @@ def identify_frontier(cov_conn):
 
     cur = cov_conn.cursor()
 
-    # Find frontier edges: A-covered -> new
-    cur.execute("""
-        INSERT INTO frontier_edges (binary_id, src_bb_rva, dst_bb_rva, edge_type)
-        SELECT e.binary_id, e.src_bb_rva, e.dst_bb_rva, e.edge_type
-        FROM graph_B_edges e
-        JOIN bb_labels lbl_src ON e.binary_id = lbl_src.binary_id AND e.src_bb_rva = lbl_src.bb_rva
-        JOIN bb_labels lbl_dst ON e.binary_id = lbl_dst.binary_id AND e.dst_bb_rva = lbl_dst.bb_rva
-        WHERE lbl_src.in_A = 1 AND lbl_dst.is_new = 1
-          AND e.edge_type != 'super_root'  -- Only exclude regular super-root, keep orphan edges
-    """)
+    with cov_conn:
+        # Find frontier edges: A-covered -> new
+        cur.execute("""
+            INSERT INTO frontier_edges (binary_id, src_bb_rva, dst_bb_rva, edge_type)
+            SELECT e.binary_id, e.src_bb_rva, e.dst_bb_rva, e.edge_type
+            FROM graph_B_edges e
+            JOIN bb_labels lbl_src ON e.binary_id = lbl_src.binary_id AND e.src_bb_rva = lbl_src.bb_rva
+            JOIN bb_labels lbl_dst ON e.binary_id = lbl_dst.binary_id AND e.dst_bb_rva = lbl_dst.bb_rva
+            WHERE lbl_src.in_A = 1 AND lbl_dst.is_new = 1
+              AND e.edge_type != 'super_root'  -- Only exclude regular super-root, keep orphan edges
+        """)
     
-    # Also add orphaned new blocks as weak frontiers
-    cur.execute("""
-        INSERT INTO frontier_edges (binary_id, src_bb_rva, dst_bb_rva, edge_type)
-        SELECT binary_id, src_bb_rva, dst_bb_rva, edge_type
-        FROM graph_B_edges
-        WHERE edge_type = 'super_root_orphan'
-    """)
-
-    # Get all unique frontier targets
-    cur.execute("""
-        SELECT DISTINCT e.binary_id, e.dst_bb_rva, lbl.func_id
-        FROM frontier_edges e
-        JOIN bb_labels lbl ON e.binary_id = lbl.binary_id AND e.dst_bb_rva = lbl.bb_rva
-    """)
-    frontier_candidates = cur.fetchall()
-
-    print(f"  Found {len(frontier_candidates)} frontier target candidates")
-    print(f"  Classifying as strong (A-only) or weak (A+B)...") 
-
-    strong_count = 0
-    weak_count = 0
-    frontier_data = []
-
-    for binary_id, bb_rva, func_id in frontier_candidates:
-        # Check if this is an orphaned block (only reachable from super-root)
+        # Also add orphaned new blocks as weak frontiers
         cur.execute("""
-            SELECT COUNT(*)
+            INSERT INTO frontier_edges (binary_id, src_bb_rva, dst_bb_rva, edge_type)
+            SELECT binary_id, src_bb_rva, dst_bb_rva, edge_type
             FROM graph_B_edges
-            WHERE binary_id = ? AND dst_bb_rva = ?
-              AND edge_type = 'super_root_orphan'
-        """, (binary_id, bb_rva))
-        
-        if cur.fetchone()[0] > 0:
-            # Orphaned blocks are weak frontiers
-            frontier_type = 'weak'
-            weak_count += 1
-        else:
-            # Regular frontier classification logic
-            cur.execute("""
-                SELECT e.src_bb_rva, lbl.in_A, lbl.is_new
-                FROM graph_B_edges e
-                JOIN bb_labels lbl ON e.binary_id = lbl.binary_id AND e.src_bb_rva = lbl.bb_rva
-                WHERE e.binary_id = ? AND e.dst_bb_rva = ?
-                  AND e.edge_type NOT LIKE 'super_root%'  -- Exclude super-root edges
-            """, (binary_id, bb_rva))
-
-            incoming_edges = cur.fetchall()
-
-            has_a_edge = False
-            has_new_edge = False
-
-            for src_rva, in_A, is_new in incoming_edges:
-                if in_A == 1:
-                    has_a_edge = True
-                if is_new == 1:
-                    has_new_edge = True
-
-            if has_a_edge and not has_new_edge:
-                frontier_type = 'strong'
-                strong_count += 1
-            else:
-                frontier_type = 'weak'
-                weak_count += 1
-
-        frontier_data.append((binary_id, bb_rva, func_id, frontier_type))
-
-    cur.executemany(
-        "INSERT INTO frontier_targets (binary_id, bb_rva, func_id, frontier_type) VALUES (?, ?, ?, ?)",
-        frontier_data
-    )
+            WHERE edge_type = 'super_root_orphan'
+        """)
+        # Frontier targets and the callsite scores look frontier edges up by dst
+        create_analysis_indexes(cov_conn, 'frontier_edges')
+
+        # Classify every frontier target in one grouped pass over its incoming edges:
+        # - orphaned blocks (reachable only from the super-root) are weak
+        # - strong: some incoming edge from an A-covered block and none from a new block
+        # - weak otherwise
+        print(f"  Classifying as strong (A-only) or weak (A+B)...") 
+        cur.execute("""
+            INSERT INTO frontier_targets (binary_id, bb_rva, func_id, frontier_type)
+            SELECT
+                c.binary_id,
+                c.bb_rva,
+                c.func_id,
+                CASE
+                    WHEN MAX(e.edge_type = 'super_root_orphan') = 1 THEN 'weak'
+                    WHEN COALESCE(MAX(e.edge_type NOT LIKE 'super_root%' AND src.in_A = 1), 0) = 1
+                     AND COALESCE(MAX(e.edge_type NOT LIKE 'super_root%' AND src.is_new = 1), 0) = 0
+                    THEN 'strong'
+                    ELSE 'weak'
+                END as frontier_type
+            FROM (
+                SELECT DISTINCT fe.binary_id, fe.dst_bb_rva as bb_rva, lbl.func_id
+                FROM frontier_edges fe
+                JOIN bb_labels lbl ON fe.binary_id = lbl.binary_id AND fe.dst_bb_rva = lbl.bb_rva
+            ) c
+            JOIN graph_B_edges e ON e.binary_id = c.binary_id AND e.dst_bb_rva = c.bb_rva
+            LEFT JOIN bb_labels src ON e.binary_id = src.binary_id AND e.src_bb_rva = src.bb_rva
+            GROUP BY c.binary_id, c.bb_rva
+        """)
+        create_analysis_indexes(cov_conn, 'frontier_targets')
 
-    cov_conn.commit()
+    strong_count, weak_count = cur.execute("""
+        SELECT
+            COALESCE(SUM(frontier_type = 'strong'), 0),
+            COALESCE(SUM(frontier_type = 'weak'), 0)
+        FROM frontier_targets
+    """).fetchone()
 
     print(f"  Strong frontier targets (A-only): {strong_count}")
     print(f"  Weak frontier targets (A+B): {weak_count}")
-    print(f"  Total frontier targets: {len(frontier_data)}")
+    print(f"  Total frontier targets: {strong_count + weak_count}")
 
     return strong_count, weak_count
 
 
-def compute_reachability(cov_conn):
-    """Compute reachability from frontier blocks to all new blocks."""
+def binary_reachability(cur, binary_id):
+    """
+    Compute the frontier -> new block reachability pairs of one binary.
+
+    The binary's G_B is re-keyed to dense node ids and stored as a CSR
+    adjacency (indptr/indices int arrays). A reverse BFS from the new blocks
+    first prunes every node that cannot reach one. All frontiers are then
+    propagated at once as packed bitsets (one Python int per node) over the
+    SCC condensation of the remaining nodes, instead of running a separate
+    BFS per frontier.
+
+    All reads happen before returning; the result is a lazy iterator of
+    (binary_id, frontier_bb_rva, new_bb_rva) rows, so cur is free again.
+    """
+    # Reachability ignores edge_type, so collapse parallel edges in SQL; the
+    # DISTINCT streams off the graph_B_edges PK without a temp B-tree
+    cur.execute("""
+        SELECT DISTINCT src_bb_rva, dst_bb_rva
+        FROM graph_B_edges
+        WHERE binary_id = ?
+        ORDER BY src_bb_rva
+    """, (binary_id,))
+    edges = cur.fetchall()
+
+    # Get all new blocks
+    cur.execute("SELECT bb_rva FROM bb_labels WHERE binary_id = ? AND is_new = 1", (binary_id,))
+    new_block_rvas = [row[0] for row in cur.fetchall()]
+
+    # Get frontier targets
+    cur.execute("SELECT bb_rva FROM frontier_targets WHERE binary_id = ?", (binary_id,))
+    frontier_targets = [row[0] for row in cur.fetchall()]
+
+    log.debug("  binary_id=%s: %s frontier targets, %s new blocks",
+              binary_id, len(frontier_targets), len(new_block_rvas))
+
+    # Dense re-key in rva order: bb_rva -> node id. Edges arrive sorted by
+    # src rva, so they are then also sorted by src node id.
+    rva_of = sorted({rva for edge in edges for rva in edge}
+                    .union(new_block_rvas, frontier_targets))
+    node_of = {bb_rva: u for u, bb_rva in enumerate(rva_of)}
+    node_count = len(rva_of)
+    src_nodes = array('l', [node_of[src] for src, _ in edges])
+    dst_nodes = array('l', [node_of[dst] for _, dst in edges])
+    del edges
+
+    # Forward CSR straight from the sorted stream: successors of u are
+    # indices[indptr[u]:indptr[u + 1]]. Each run of equal sources ends at
+    # its last position; a running max fills in nodes without out-edges.
+    indices = dst_nodes
+    indptr = array('l', [0]) * (node_count + 1)
+    for pos, u in enumerate(src_nodes, 1):
+        indptr[u + 1] = pos
+    indptr = array('l', accumulate(indptr, max))
+
+    # Reverse CSR by counting scatter: predecessors of v are
+    # rev_indices[rev_indptr[v]:rev_indptr[v + 1]]
+    rev_degree = [0] * (node_count + 1)
+    for v in dst_nodes:
+        rev_degree[v + 1] += 1
+    rev_indptr = array('l', accumulate(rev_degree))
+    rev_fill = array('l', rev_indptr)
+    rev_indices = array('l', [0]) * len(src_nodes)
+    for u, v in zip(src_nodes, dst_nodes):
+        rev_indices[rev_fill[v]] = u
+        rev_fill[v] += 1
+    del src_nodes, rev_fill, rev_degree
+
+    # Dense-id views of the new blocks and frontier targets: from here on the
+    # traversal touches only int arrays and byte masks, never the rva dict
+    frontier_nodes = array('l', [node_of[bb_rva] for bb_rva in frontier_targets])
+    new_mask = bytearray(node_count)
+    for bb_rva in new_block_rvas:
+        new_mask[node_of[bb_rva]] = 1
+    del node_of
+
+    # Reverse BFS from the new blocks: only nodes that can still reach a new
+    # block ever need a frontier bitset, so everything else is pruned up front
+    useful = bytearray(new_mask)
+    queue = deque(compress(range(node_count), new_mask))
+    while queue:
+        current = queue.popleft()
+        for pred in rev_indices[rev_indptr[current]:rev_indptr[current + 1]]:
+            if not useful[pred]:
+                useful[pred] = 1
+                queue.append(pred)
+    del rev_indptr, rev_indices
+
+    # Multi-source propagation of packed frontier bitsets: bit k of
+    # reached_by[u] is set when frontier_targets[k] reaches node u.
+    reached_by = [0] * node_count
+    for k, u in enumerate(frontier_nodes):
+        if useful[u]:
+            reached_by[u] |= 1 << k
+    propagate_bitsets(indptr, indices, reached_by, useful)
+
+    # Traversal never tests is_new; the new-block mask is applied once here
+    return ((binary_id, frontier_targets[k], rva_of[u])
+            for u, bits in compress(enumerate(reached_by), new_mask) if bits
+            for k in iter_set_bits(bits))
+
+
+def _binary_reachability_worker(task):
+    """Process-pool entry point: binary_reachability over a read-only connection."""
+    db_uri, binary_id = task
+    conn = sqlite3.connect(db_uri, uri=True)
+    try:
+        return binary_id, list(binary_reachability(conn.cursor(), binary_id))
+    finally:
+        conn.close()
+
+
+def compute_reachability(cov_conn, jobs=1):
+    """
+    Compute reachability from frontier blocks to all new blocks.
+
+    Binaries are independent, so with jobs > 1 they are computed in a process
+    pool; workers read the committed G_B through their own read-only
+    connections (WAL lets them run beside this writer) and only the resulting
+    rows travel back to be inserted here.
+    """
     print("Step 6: Computing reachability from frontier blocks...")
     
     cur = cov_conn.cursor()
+    insert_sql = "INSERT OR IGNORE INTO frontier_reachability (binary_id, frontier_bb_rva, new_bb_rva)"
     
-    binaries = cur.execute("SELECT DISTINCT binary_id FROM graph_B_nodes").fetchall()
+    with cov_conn:
+        binaries = [row[0] for row in cur.execute("SELECT DISTINCT binary_id FROM graph_B_nodes")]
     
-    total_reachability_pairs = 0
+        total_reachability_pairs = 0
     
-    for (binary_id,) in binaries:
-        print(f"  Computing reachability for binary_id={binary_id}...")
-        
-        # Build adjacency list for G_B
-        cur.execute("SELECT src_bb_rva, dst_bb_rva FROM graph_B_edges WHERE binary_id = ?", (binary_id,))
-        edges = cur.fetchall()
-        
-        from collections import deque
-        adjacency = defaultdict(list)
-        for src, dst in edges:
-            adjacency[src].append(dst)
-        
-        # Get all new blocks
-        cur.execute("SELECT bb_rva FROM bb_labels WHERE binary_id = ? AND is_new = 1", (binary_id,))
-        new_blocks = set(row[0] for row in cur.fetchall())
-        
-        # Get frontier targets
-        cur.execute("SELECT bb_rva FROM frontier_targets WHERE binary_id = ?", (binary_id,))
-        frontier_targets = [row[0] for row in cur.fetchall()]
-        
-        print(f"    {len(frontier_targets)} frontier targets, {len(new_blocks)} new blocks")
-        
-        reachability_data = []
-        
-        for frontier_bb in frontier_targets:
-            # BFS from this frontier block
-            reachable_new = set()
-            visited = set()
-            queue = deque([frontier_bb])
-            visited.add(frontier_bb)
-            
-            while queue:
-                current = queue.popleft()
-                
-                if current in new_blocks:
-                    reachable_new.add(current)
-                
-                for neighbor in adjacency[current]:
-                    if neighbor not in visited:
-                        visited.add(neighbor)
-                        queue.append(neighbor)
-            
-            for new_bb in reachable_new:
-                reachability_data.append((binary_id, frontier_bb, new_bb))
-        
-        if reachability_data:
-            cur.executemany(
-                "INSERT OR IGNORE INTO frontier_reachability VALUES (?, ?, ?)",
-                reachability_data
-            )
-            total_reachability_pairs += len(reachability_data)
-            print(f"    Stored {len(reachability_data)} reachability pairs")
+        if jobs > 1 and len(binaries) > 1:
+            db_file = next(row[2] for row in cur.execute("PRAGMA database_list") if row[1] == 'main')
+            db_uri = Path(db_file).as_uri() + "?mode=ro"
+            with ProcessPoolExecutor(max_workers=min(jobs, len(binaries))) as pool:
+                for binary_id, rows in pool.map(_binary_reachability_worker,
+                                                [(db_uri, binary_id) for binary_id in binaries]):
+                    stored = bulk_insert(cur, insert_sql, 3, rows)
+                    total_reachability_pairs += stored
+                    log.debug("  binary_id=%s: stored %s reachability pairs", binary_id, stored)
+        else:
+            for binary_id in binaries:
+                # Pairs stream straight into the inserts instead of a materialised list
+                stored = bulk_insert(cur, insert_sql, 3, binary_reachability(cur, binary_id))
+                total_reachability_pairs += stored
+                log.debug("  binary_id=%s: stored %s reachability pairs", binary_id, stored)
     
-    cov_conn.commit()
+        create_analysis_indexes(cov_conn, 'frontier_reachability')
+
     print(f"  Total: {total_reachability_pairs} frontier->new-block reachability pairs")
 
 
 def compute_attribution(cov_conn):
-    """Attribute new coverage to frontier targets."""
+    """
+    Attribute new coverage to frontier targets.
+
+    A new block reached by exactly one frontier is attributed uniquely to it;
+    one reached by several is shared. Both reductions are GROUP BYs over
+    frontier_reachability, which is already ordered by each grouping key.
+    """
     print("Step 7: Computing attribution from reachability...")
     
     cur = cov_conn.cursor()
     
-    binaries = cur.execute("SELECT DISTINCT binary_id FROM graph_B_nodes").fetchall()
-    
-    total_attributed = 0
+    with cov_conn:
+        cur.execute("""
+            INSERT OR REPLACE INTO bb_attributed_to (binary_id, new_bb_rva, frontier_bb_rva, is_shared)
+            SELECT
+                binary_id,
+                new_bb_rva,
+                CASE WHEN COUNT(*) = 1 THEN MIN(frontier_bb_rva) END,
+                COUNT(*) > 1
+            FROM frontier_reachability
+            GROUP BY binary_id, new_bb_rva
+        """)
+        total_attributed = cur.rowcount
     
-    for (binary_id,) in binaries:
-        print(f"  Processing binary_id={binary_id}...")
-        
-        cur.execute("SELECT bb_rva FROM frontier_targets WHERE binary_id = ?", (binary_id,))
-        frontier_targets = [row[0] for row in cur.fetchall()]
-        
-        cur.execute("SELECT bb_rva, func_id FROM bb_labels WHERE binary_id = ? AND is_new = 1", (binary_id,))
-        new_blocks = {row[0]: row[1] for row in cur.fetchall()}
-        
-        print(f"    {len(frontier_targets)} frontier targets, {len(new_blocks)} new blocks")
-        
-        new_block_to_frontiers = defaultdict(list)
-        
         cur.execute("""
-            SELECT frontier_bb_rva, new_bb_rva 
-            FROM frontier_reachability 
-            WHERE binary_id = ?
-        """, (binary_id,))
-        
-        for frontier_bb, new_bb in cur.fetchall():
-            new_block_to_frontiers[new_bb].append(frontier_bb)
-        
-        frontier_attribution_map = defaultdict(lambda: {'unique': set(), 'shared': set(), 'funcs': set()})
-        block_attribution = {}
-        
-        for new_bb, frontiers in new_block_to_frontiers.items():
-            func_id = new_blocks[new_bb]
-            
-            if len(frontiers) == 1:
-                frontier = frontiers[0]
-                frontier_attribution_map[frontier]['unique'].add(new_bb)
-                frontier_attribution_map[frontier]['funcs'].add(func_id)
-                block_attribution[new_bb] = (frontier, 0)
-            else:
-                for frontier in frontiers:
-                    frontier_attribution_map[frontier]['shared'].add(new_bb)
-                    frontier_attribution_map[frontier]['funcs'].add(func_id)
-                block_attribution[new_bb] = (None, 1)
-        
-        attr_data = []
-        for frontier, data in frontier_attribution_map.items():
-            unique_count = len(data['unique'])
-            shared_count = len(data['shared'])
-            total_count = unique_count + shared_count
-            func_count = len(data['funcs'])
-            attr_data.append((binary_id, frontier, total_count, unique_count, shared_count, func_count))
-        
-        if attr_data:
-            cur.executemany(
-                "INSERT OR REPLACE INTO frontier_attribution VALUES (?, ?, ?, ?, ?, ?)",
-                attr_data
-            )
-        
-        block_attr_data = [(binary_id, bb, frontier, is_shared) 
-                          for bb, (frontier, is_shared) in block_attribution.items()]
-        if block_attr_data:
-            cur.executemany(
-                "INSERT OR REPLACE INTO bb_attributed_to VALUES (?, ?, ?, ?)",
-                block_attr_data
-            )
-        
-        total_attributed += len(block_attr_data)
-        print(f"    Attributed {len(block_attr_data)} blocks across {len(frontier_attribution_map)} frontiers")
+            INSERT OR REPLACE INTO frontier_attribution
+                (binary_id, frontier_bb_rva, attributed_new_bb_count, unique_new_bb_count,
+                 shared_new_bb_count, attributed_new_func_count)
+            SELECT
+                fr.binary_id,
+                fr.frontier_bb_rva,
+                COUNT(*),
+                SUM(ba.is_shared = 0),
+                SUM(ba.is_shared = 1),
+                COUNT(DISTINCT bb.func_id)
+            FROM frontier_reachability fr
+            JOIN bb_attributed_to ba
+              ON ba.binary_id = fr.binary_id AND ba.new_bb_rva = fr.new_bb_rva
+            JOIN bb_labels bb
+              ON bb.binary_id = fr.binary_id AND bb.bb_rva = fr.new_bb_rva
+            GROUP BY fr.binary_id, fr.frontier_bb_rva
+        """)
     
-    cov_conn.commit()
+        create_analysis_indexes(cov_conn, 'frontier_attribution')
+        create_analysis_indexes(cov_conn, 'bb_attributed_to')
+
     print(f"  Total: Attributed {total_attributed} new blocks to frontier targets")
 
 
-def aggregate_scores(cov_conn, master_conn):
+def aggregate_scores(cov_conn):
     """Aggregate attribution scores to functions and callsites."""
     print("Step 8: Aggregating scores...")
 
     cov_cur = cov_conn.cursor()
-    master_cur = master_conn.cursor()
-
-    cov_cur.execute("""
-        INSERT INTO function_unlock_scores 
-        SELECT 
-            bb.binary_id,
-            bb.func_id,
-            '' as func_name,
-            COUNT(DISTINCT CASE WHEN ba.is_shared = 0 THEN ba.new_bb_rva END) as unique_new_bb,
-            COUNT(DISTINCT CASE WHEN ba.is_shared = 1 THEN ba.new_bb_rva END) as shared_new_bb,
-            COUNT(DISTINCT fr.new_bb_rva) as total_new_bb,
-            COUNT(DISTINCT fa.frontier_bb_rva) as frontier_count,
-            -- FIX: Use COUNT(DISTINCT ...) instead of SUM()
-            COUNT(DISTINCT CASE WHEN ft.frontier_type = 'strong' THEN fa.frontier_bb_rva END) as strong_frontier_count,
-            COUNT(DISTINCT CASE WHEN ft.frontier_type = 'weak' THEN fa.frontier_bb_rva END) as weak_frontier_count
-        FROM bb_labels bb
-        JOIN frontier_attribution fa 
-          ON bb.binary_id = fa.binary_id AND bb.bb_rva = fa.frontier_bb_rva
-        JOIN frontier_targets ft 
-          ON fa.binary_id = ft.binary_id AND fa.frontier_bb_rva = ft.bb_rva
-        JOIN frontier_reachability fr 
-          ON fa.binary_id = fr.binary_id AND fa.frontier_bb_rva = fr.frontier_bb_rva
-        LEFT JOIN bb_attributed_to ba 
-          ON fr.binary_id = ba.binary_id AND fr.new_bb_rva = ba.new_bb_rva
-        WHERE bb.func_id IS NOT NULL
-        GROUP BY bb.binary_id, bb.func_id
-    """)
-
-    # Add function names
-    cov_cur.execute("SELECT DISTINCT binary_id, func_id FROM function_unlock_scores")
-    for binary_id, func_id in cov_cur.fetchall():
-        master_cur.execute(
-            "SELECT func_name FROM functions WHERE binary_id = ? AND func_id = ?", 
-            (binary_id, func_id)
-        )
-        result = master_cur.fetchone()
-        if result:
-            cov_cur.execute(
-                "UPDATE function_unlock_scores SET func_name = ? WHERE binary_id = ? AND func_id = ?", 
-                (result[0], binary_id, func_id)
-            )
-
-    # Callsite scores
-    cov_cur.execute("""
-        INSERT INTO callsite_unlock_scores
-        SELECT 
-            fe.binary_id,
-            fe.src_bb_rva,
-            bb_src.func_id as src_func_id,
-            NULL as src_func_name,
-            bb_dst.func_id as dst_func_id,
-            NULL as dst_func_name,
-            SUM(fa.unique_new_bb_count) as unique_new_bb,
-            SUM(fa.shared_new_bb_count) as shared_new_bb,
-            SUM(fa.attributed_new_bb_count) as total_new_bb
-        FROM frontier_edges fe
-        JOIN frontier_attribution fa 
-          ON fe.binary_id = fa.binary_id AND fe.dst_bb_rva = fa.frontier_bb_rva
-        JOIN bb_labels bb_src ON fe.binary_id = bb_src.binary_id AND fe.src_bb_rva = bb_src.bb_rva
-        JOIN bb_labels bb_dst ON fe.binary_id = bb_dst.binary_id AND fe.dst_bb_rva = bb_dst.bb_rva
-        WHERE fe.edge_type NOT LIKE 'super_root%'
-        GROUP BY fe.binary_id, fe.src_bb_rva, bb_dst.func_id, bb_src.func_id
-    """)
-
-    cov_cur.execute("SELECT DISTINCT binary_id, src_func_id, dst_func_id FROM callsite_unlock_scores")
-    for binary_id, src_func_id, dst_func_id in cov_cur.fetchall():
-        master_cur.execute(
-            "SELECT func_name FROM functions WHERE binary_id = ? AND func_id = ?", 
-            (binary_id, src_func_id)
-        )
-        result = master_cur.fetchone()
-        src_name = result[0] if result else None
 
-        if dst_func_id is not None:
-            master_cur.execute(
-                "SELECT func_name FROM functions WHERE binary_id = ? AND func_id = ?", 
-                (binary_id, dst_func_id)
-            )
-            result = master_cur.fetchone()
-            dst_name = result[0] if result else None
-        else:
-            dst_name = None
+    with cov_conn:
+        # Deduplicate once at the two grains the function scores count, so the
+        # aggregate below is plain COUNT/SUM with no per-group DISTINCT B-trees.
+        # Frontier grain: each frontier with any reached block, with its type
+        # folded into 0/1 flags. Block grain: each new block reached from any of
+        # the function's frontiers, deduplicated by the primary key. CROSS JOIN
+        # pins the order: drive from the frontier targets (the smallest input)
+        # and reach every other table through its primary key.
+        cov_cur.execute("DROP TABLE IF EXISTS temp.func_frontiers")
+        cov_cur.execute("""
+            CREATE TEMP TABLE func_frontiers (
+                binary_id INTEGER NOT NULL,
+                func_id INTEGER NOT NULL,
+                frontier_bb_rva INTEGER NOT NULL,
+                is_strong INTEGER NOT NULL,
+                is_weak INTEGER NOT NULL,
+                PRIMARY KEY (binary_id, func_id, frontier_bb_rva)
+            ) WITHOUT ROWID
+        """)
+        cov_cur.execute("""
+            INSERT INTO func_frontiers
+            SELECT bb.binary_id, bb.func_id, fa.frontier_bb_rva,
+                   ft.frontier_type = 'strong', ft.frontier_type = 'weak'
+            FROM frontier_targets ft
+            CROSS JOIN frontier_attribution fa 
+              ON fa.binary_id = ft.binary_id AND fa.frontier_bb_rva = ft.bb_rva
+            CROSS JOIN bb_labels bb 
+              ON bb.binary_id = fa.binary_id AND bb.bb_rva = fa.frontier_bb_rva
+            WHERE bb.func_id IS NOT NULL
+              AND EXISTS (
+                  SELECT 1 FROM frontier_reachability fr
+                  WHERE fr.binary_id = fa.binary_id AND fr.frontier_bb_rva = fa.frontier_bb_rva
+              )
+        """)
 
-        cov_cur.execute(
-            """UPDATE callsite_unlock_scores 
-               SET src_func_name = ?, dst_func_name = ? 
-               WHERE binary_id = ? AND src_func_id = ? AND (dst_func_id IS ? OR (dst_func_id IS NULL AND ? IS NULL))""",
-            (src_name, dst_name, binary_id, src_func_id, dst_func_id, dst_func_id)
-        )
+        cov_cur.execute("DROP TABLE IF EXISTS temp.func_new_blocks")
+        cov_cur.execute("""
+            CREATE TEMP TABLE func_new_blocks (
+                binary_id INTEGER NOT NULL,
+                func_id INTEGER NOT NULL,
+                new_bb_rva INTEGER NOT NULL,
+                is_shared INTEGER,
+                PRIMARY KEY (binary_id, func_id, new_bb_rva)
+            ) WITHOUT ROWID
+        """)
+        cov_cur.execute("""
+            INSERT OR IGNORE INTO func_new_blocks
+            SELECT ff.binary_id, ff.func_id, fr.new_bb_rva, ba.is_shared
+            FROM func_frontiers ff
+            CROSS JOIN frontier_reachability fr 
+              ON fr.binary_id = ff.binary_id AND fr.frontier_bb_rva = ff.frontier_bb_rva
+            LEFT JOIN bb_attributed_to ba 
+              ON ba.binary_id = fr.binary_id AND ba.new_bb_rva = fr.new_bb_rva
+        """)
 
-    cov_conn.commit()
+        # Names are resolved on insert: the LEFT JOIN probes the m.functions PK
+        # once per aggregated row, after grouping has shrunk the input
+        cov_cur.execute("""
+            INSERT INTO function_unlock_scores 
+            SELECT 
+                f.binary_id,
+                f.func_id,
+                COALESCE(fn.func_name, '') as func_name,
+                b.unique_new_bb,
+                b.shared_new_bb,
+                b.total_new_bb,
+                f.frontier_count,
+                f.strong_frontier_count,
+                f.weak_frontier_count
+            FROM (
+                SELECT 
+                    binary_id,
+                    func_id,
+                    COUNT(*) as frontier_count,
+                    SUM(is_strong) as strong_frontier_count,
+                    SUM(is_weak) as weak_frontier_count
+                FROM func_frontiers
+                GROUP BY binary_id, func_id
+            ) f
+            JOIN (
+                SELECT 
+                    binary_id,
+                    func_id,
+                    SUM(is_shared IS 0) as unique_new_bb,
+                    SUM(is_shared IS 1) as shared_new_bb,
+                    COUNT(*) as total_new_bb
+                FROM func_new_blocks
+                GROUP BY binary_id, func_id
+            ) b ON b.binary_id = f.binary_id AND b.func_id = f.func_id
+            LEFT JOIN m.functions fn ON fn.binary_id = f.binary_id AND fn.func_id = f.func_id
+        """)
+        cov_cur.execute("DROP TABLE temp.func_frontiers")
+        cov_cur.execute("DROP TABLE temp.func_new_blocks")
+
+        # Callsite scores (join order pinned: frontier edges drive, the rest are PK
+        # probes). Caller and callee names stay NULL when the function is unknown.
+        cov_cur.execute("""
+            INSERT INTO callsite_unlock_scores
+            SELECT 
+                s.binary_id,
+                s.src_bb_rva,
+                s.src_func_id,
+                src_fn.func_name as src_func_name,
+                s.dst_func_id,
+                dst_fn.func_name as dst_func_name,
+                s.unique_new_bb,
+                s.shared_new_bb,
+                s.total_new_bb
+            FROM (
+                SELECT 
+                    fe.binary_id,
+                    fe.src_bb_rva,
+                    bb_src.func_id as src_func_id,
+                    bb_dst.func_id as dst_func_id,
+                    SUM(fa.unique_new_bb_count) as unique_new_bb,
+                    SUM(fa.shared_new_bb_count) as shared_new_bb,
+                    SUM(fa.attributed_new_bb_count) as total_new_bb
+                FROM frontier_edges fe
+                CROSS JOIN frontier_attribution fa 
+                  ON fe.binary_id = fa.binary_id AND fe.dst_bb_rva = fa.frontier_bb_rva
+                CROSS JOIN bb_labels bb_src ON fe.binary_id = bb_src.binary_id AND fe.src_bb_rva = bb_src.bb_rva
+                CROSS JOIN bb_labels bb_dst ON fe.binary_id = bb_dst.binary_id AND fe.dst_bb_rva = bb_dst.bb_rva
+                WHERE fe.edge_type NOT LIKE 'super_root%'
+                GROUP BY fe.binary_id, fe.src_bb_rva, bb_dst.func_id, bb_src.func_id
+            ) s
+            LEFT JOIN m.functions src_fn ON src_fn.binary_id = s.binary_id AND src_fn.func_id = s.src_func_id
+            LEFT JOIN m.functions dst_fn ON dst_fn.binary_id = s.binary_id AND dst_fn.func_id = s.dst_func_id
+        """)
 
     func_count = cov_cur.execute("SELECT COUNT(*) FROM function_unlock_scores").fetchone()[0]
     call_count = cov_cur.execute("SELECT COUNT(*) FROM callsite_unlock_scores").fetchone()[0]
@@ -1102,9 +1394,15 @@ def main():
     parser.add_argument("--edges-b", default="cov_B_edges", help="Coverage B edges table name")
     parser.add_argument("--missing-output", default="missing_blocks.json", 
                        help="Output file for missing blocks (default: missing_blocks.json)")
+    parser.add_argument("-j", "--jobs", type=int, default=1,
+                       help="Worker processes for per-binary reachability (default: 1)")
+    parser.add_argument("-v", "--verbose", action="store_true",
+                       help="Print per-binary progress details")
 
     args = parser.parse_args()
 
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO, format="%(message)s")
+
     if not Path(args.master_db).exists():
         print(f"Error: Master DB not found: {args.master_db}", file=sys.stderr)
         sys.exit(1)
@@ -1118,29 +1416,49 @@ def main():
     print("NOTE: Handles return addresses by mapping to containing BBs")
     print("="*60)
 
+    # Index and analyze master.db up front; the analysis only ever reads it
     master_conn = sqlite3.connect(args.master_db)
-    cov_conn = sqlite3.connect(args.cov_db)
+    try:
+        create_master_indexes(master_conn)
+    finally:
+        master_conn.close()
 
-    # Enable performance optimizations
-    cov_conn.execute("PRAGMA journal_mode=WAL")
-    cov_conn.execute("PRAGMA synchronous=NORMAL")
-    cov_conn.execute("PRAGMA cache_size=10000")
+    # Implicit transactions start with BEGIN IMMEDIATE so each phase takes the
+    # write lock once and commits once
+    cov_conn = sqlite3.connect(Path(args.cov_db).resolve().as_uri(), uri=True,
+                               isolation_level="IMMEDIATE",
+                               cached_statements=STATEMENT_CACHE_SIZE)
+
+    # Attach master.db read-only so coverage is joined to static analysis in SQL
+    cov_conn.execute("ATTACH DATABASE ? AS m", (Path(args.master_db).resolve().as_uri() + "?mode=ro",))
+
+    # Enable performance optimizations (journal settings on main only; the
+    # unqualified pragma would also try to switch the read-only master.db)
+    cov_conn.execute("PRAGMA main.journal_mode=WAL")
+    cov_conn.execute("PRAGMA main.synchronous=NORMAL")
     cov_conn.execute("PRAGMA temp_store=MEMORY")
+    cov_conn.execute("PRAGMA busy_timeout=5000")
+    for schema in ("main", "m"):
+        cov_conn.execute(f"PRAGMA {schema}.cache_size=-262144")  # 256 MiB
+        cov_conn.execute(f"PRAGMA {schema}.mmap_size=30000000000")
 
     try:
         create_analysis_tables(cov_conn)
+        # Statistics for the imported coverage tables; the analysis tables are
+        # analyzed as they are filled (see create_analysis_indexes)
+        cov_conn.execute("ANALYZE main")
 
-        mapped_count, unmapped = map_modules_to_binaries(cov_conn, master_conn)
+        mapped_count, unmapped = map_modules_to_binaries(cov_conn)
 
         if mapped_count == 0:
             print("ERROR: No modules could be mapped to binaries!", file=sys.stderr)
             sys.exit(1)
 
-        missing_A = join_coverage_to_blocks(cov_conn, master_conn, "A", args.blocks_a, args.edges_a)
-        expand_deterministic_for_sample(cov_conn, master_conn, 'A')
+        missing_A = join_coverage_to_blocks(cov_conn, "A", args.blocks_a, args.edges_a)
+        expand_deterministic_for_sample(cov_conn, 'A')
 
-        missing_B = join_coverage_to_blocks(cov_conn, master_conn, "B", args.blocks_b, args.edges_b)
-        expand_deterministic_for_sample(cov_conn, master_conn, 'B')
+        missing_B = join_coverage_to_blocks(cov_conn, "B", args.blocks_b, args.edges_b)
+        expand_deterministic_for_sample(cov_conn, 'B')
 
         missing_data = {
             "unmapped_modules": [{"module_id": m[0], "name": m[1], "sha256": m[2]} for m in unmapped],
@@ -1153,11 +1471,11 @@ def main():
         print(f"Wrote missing blocks report to {args.missing_output}")
 
         compute_diff_labels(cov_conn)
-        build_executed_graph(cov_conn, master_conn, args.edges_b)
+        build_executed_graph(cov_conn, args.edges_b)
         identify_frontier(cov_conn)
-        compute_reachability(cov_conn)
+        compute_reachability(cov_conn, args.jobs)
         compute_attribution(cov_conn)
-        aggregate_scores(cov_conn, master_conn)
+        aggregate_scores(cov_conn)
 
         print_summary(cov_conn)
 
@@ -1169,7 +1487,6 @@ def main():
         traceback.print_exc()
         sys.exit(1)
     finally:
-        master_conn.close()
         cov_conn.close()
 
 
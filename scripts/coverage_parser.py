@@ -1,9 +1,26 @@
 import sqlite3
-import re
 import argparse
 import json
 from pathlib import Path
 
+from db_util import bulk_insert
+
+HEX_DIGITS = '0123456789abcdefABCDEF'
+
+def open_db(db_path):
+    """
+    Open the coverage database tuned for bulk loading.
+    
+    WAL with synchronous=NORMAL commits without an fsync per transaction; the
+    larger page cache keeps the PK B-trees resident while rows stream in.
+    """
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA cache_size=-65536")  # 64 MiB
+    return conn
+
 def create_modules_table(db_path, modules_json_path):
     """
     Create modules table and populate it from JSON file.
@@ -15,7 +32,7 @@ def create_modules_table(db_path, modules_json_path):
     Returns:
         dict: Mapping of module_name to module_id
     """
-    conn = sqlite3.connect(db_path)
+    conn = open_db(db_path)
     cursor = conn.cursor()
     
     # Create modules table
@@ -33,19 +50,18 @@ def create_modules_table(db_path, modules_json_path):
     with open(modules_json_path, 'r') as f:
         modules_data = json.load(f)
     
-    # Insert modules
-    module_name_to_id = {}
-    for module_name, sha256_hash in modules_data.items():
-        cursor.execute(
+    # Insert modules in one transaction, then read all ids back in one query
+    with conn:
+        cursor.executemany(
             "INSERT OR IGNORE INTO modules (name, sha256_hash) VALUES (?, ?)",
-            (module_name, sha256_hash)
+            modules_data.items()
         )
-        # Get the module id
-        cursor.execute("SELECT id FROM modules WHERE name = ?", (module_name,))
-        module_id = cursor.fetchone()[0]
-        module_name_to_id[module_name] = module_id
+        module_name_to_id = {
+            name: module_id
+            for module_id, name in cursor.execute("SELECT id, name FROM modules")
+            if name in modules_data
+        }
     
-    conn.commit()
     print(f"Loaded {len(module_name_to_id)} modules from {modules_json_path}")
     
     conn.close()
@@ -61,7 +77,7 @@ def parse_coverage_file(filepath, db_path, sample_name, module_name_to_id):
         sample_name: 'a' or 'b' to distinguish samples
         module_name_to_id: Dictionary mapping module names to their IDs
     """
-    conn = sqlite3.connect(db_path)
+    conn = open_db(db_path)
     cursor = conn.cursor()
     
     # Create tables for this sample
@@ -95,22 +111,20 @@ def parse_coverage_file(filepath, db_path, sample_name, module_name_to_id):
     edges_data = []
     unknown_modules = set()
     
-    # Parse the file
-    pattern = re.compile(r'^(.+?)\+([0-9a-fA-F]+)$')
-    
+    # Parse the file. Lines are "<module>+<hex>": split on the last '+' and
+    # require a hex-only suffix (stripping the hex digits must leave nothing)
     with open(filepath, 'r') as f:
         for line in f:
             line = line.strip()
             if not line:
                 continue
-                
-            match = pattern.match(line)
-            if not match:
+            
+            module_name, _, hex_value = line.rpartition('+')
+            if not module_name or not hex_value or hex_value.strip(HEX_DIGITS):
                 print(f"Warning: Could not parse line: {line}")
                 continue
             
-            module_name = match.group(1)
-            value = int(match.group(2), 16)
+            value = int(hex_value, 16)
             
             # Look up module ID
             if module_name not in module_name_to_id:
@@ -135,20 +149,23 @@ def parse_coverage_file(filepath, db_path, sample_name, module_name_to_id):
                 bb_rva = lower_32
                 blocks_data.append((module_id, bb_rva))
     
-    # Bulk insert
-    if blocks_data:
-        cursor.executemany(
-            f"INSERT OR IGNORE INTO {blocks_table} (module_id, bb_rva) VALUES (?, ?)",
-            blocks_data
-        )
-    
-    if edges_data:
-        cursor.executemany(
-            f"INSERT OR IGNORE INTO {edges_table} (module_id, src_bb_rva, dst_bb_rva) VALUES (?, ?, ?)",
-            edges_data
-        )
-    
-    conn.commit()
+    # Bulk insert, both tables in a single transaction
+    with conn:
+        if blocks_data:
+            bulk_insert(
+                cursor,
+                f"INSERT OR IGNORE INTO {blocks_table} (module_id, bb_rva)",
+                2,
+                blocks_data
+            )
+        
+        if edges_data:
+            bulk_insert(
+                cursor,
+                f"INSERT OR IGNORE INTO {edges_table} (module_id, src_bb_rva, dst_bb_rva)",
+                3,
+                edges_data
+            )
     
     print(f"Sample {sample_name.upper()} imported:")
     print(f"  - {len(blocks_data)} basic blocks")
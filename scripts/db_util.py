@@ -0,0 +1,48 @@
+"""
+SQLite helpers shared by the coverage scripts.
+"""
+
+import sqlite3
+from itertools import chain, islice
+
+
+# Upper bound on rows per multi-row INSERT issued by bulk_insert; the actual
+# chunk is also capped by the connection's bound-parameter limit
+BULK_INSERT_ROWS = 500
+
+# SQLITE_MAX_VARIABLE_NUMBER of SQLite builds before 3.32, still common as the
+# system library on LTS distributions; used when the limit cannot be queried
+DEFAULT_VARIABLE_LIMIT = 999
+
+
+def bulk_insert(cur, insert_sql, width, rows, chunk=BULK_INSERT_ROWS):
+    """
+    Insert rows with multi-row "VALUES (...), (...)" statements.
+    
+    insert_sql is the statement up to (not including) VALUES and width the
+    number of columns per row. rows may be any iterable, including a generator;
+    it is consumed at most chunk rows at a time, fewer if chunk * width would
+    exceed the connection's bound-parameter limit, and the short tail goes
+    through a single-row executemany. Returns the number of rows actually
+    inserted.
+    """
+    try:
+        variable_limit = cur.connection.getlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER)
+    except AttributeError:  # Connection.getlimit is Python 3.11+
+        variable_limit = DEFAULT_VARIABLE_LIMIT
+    chunk = max(1, min(chunk, variable_limit // width))
+    
+    row_placeholders = "(" + ", ".join("?" * width) + ")"
+    chunk_sql = f"{insert_sql} VALUES " + ", ".join([row_placeholders] * chunk)
+    rows = iter(rows)
+    inserted = 0
+    while True:
+        batch = list(islice(rows, chunk))
+        if len(batch) < chunk:
+            break
+        cur.execute(chunk_sql, list(chain.from_iterable(batch)))
+        inserted += cur.rowcount
+    if batch:
+        cur.executemany(f"{insert_sql} VALUES {row_placeholders}", batch)
+        inserted += cur.rowcount
+    return inserted
@@ -9,187 +9,218 @@ import sqlite3
 import json
 import sys
 from pathlib import Path
-from collections import defaultdict
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
+from dataclasses import dataclass
+from itertools import islice
+from typing import Optional
 
+try:
+    import orjson  # optional: much faster serializer for large exports
+except ImportError:
+    orjson = None
+
+
+# Block status by status code (in_B << 1) | in_A:
+#   "new": in B but not in A (new coverage)
+#   "in_A": in A but not in B (lost coverage)
+#   "in_both": in both A and B (maintained coverage)
+#   "neither": should not happen in our data
+BLOCK_STATUS = ("neither", "in_A", "new", "in_both")
+IN_A_BIT = 1
+IN_B_BIT = 2
 
-def get_block_status(in_A, in_B):
-    """
-    Convert in_A/in_B flags to status string.
-    
-    Returns:
-        "new": in B but not in A (new coverage)
-        "in_A": in A but not in B (lost coverage)
-        "in_both": in both A and B (maintained coverage)
-    """
-    if in_B and not in_A:
-        return "new"
-    elif in_A and not in_B:
-        return "in_A"
-    elif in_A and in_B:
-        return "in_both"
-    else:
-        return "neither"  # Should not happen in our data
 
+# Bit of a function's status mask set by its "new" blocks; the mask ORs
+# 1 << status_code over all of the function's blocks
+NEW_STATUS_MASK = 1 << BLOCK_STATUS.index("new")
 
-def get_function_status(blocks_status):
+
+# Shared, never-mutated payloads for blocks and functions without scores
+NO_FRONTIER_SCORES = {
+    'total_new_bb': 0,
+    'unique_new_bb': 0,
+    'shared_new_bb': 0
+}
+NOT_ATTRIBUTED = {
+    'is_attributed': False,
+    'frontier_bb_rva': None,
+    'is_shared': False
+}
+NO_FUNCTION_SCORES = {
+    'total_new_bb': 0,
+    'unique_new_bb': 0,
+    'shared_new_bb': 0,
+    'frontier_count': 0,
+    'strong_frontier_count': 0,
+    'weak_frontier_count': 0
+}
+
+
+# __slots__ is spelled out rather than using dataclass(slots=True) (3.10+), so
+# the exporter runs on the same Python versions as the parser and analyzer.
+@dataclass
+class Block:
+    """One covered basic block; serializes as an object with these keys in order."""
+    __slots__ = ('bb_rva', 'bb_start_va', 'bb_end_va', 'bb_size', 'status',
+                 'is_frontier', 'frontier_type', 'frontier_attribution', 'attribution')
+    bb_rva: str
+    bb_start_va: Optional[str]
+    bb_end_va: Optional[str]
+    bb_size: int
+    status: str
+    is_frontier: bool
+    frontier_type: Optional[str]
+    frontier_attribution: Optional[dict]
+    attribution: dict
+
+
+@dataclass
+class Function:
+    """One covered function; serializes as an object with these keys in order."""
+    __slots__ = ('func_id', 'func_name', 'entry_rva', 'start_va', 'end_va', 'func_size',
+                 'status', 'is_indirectly_called', 'blocks', 'attribution')
+    func_id: int
+    func_name: str
+    entry_rva: str
+    start_va: str
+    end_va: str
+    func_size: int
+    status: str
+    is_indirectly_called: bool
+    blocks: list
+    attribution: dict
+
+
+def get_function_status(status_mask):
     """
     Determine function status based on its blocks.
     
     Args:
-        blocks_status: dict mapping bb_rva -> status
+        status_mask: OR of 1 << status_code over the function's blocks
         
     Returns:
         "new": all blocks are new
         "changed": mix of new and old blocks
         "old": no new blocks (all in A or both)
     """
-    statuses = set(blocks_status.values())
-    
-    if "new" in statuses:
-        if len(statuses) == 1:
-            return "new"
-        else:
-            return "changed"
+    if status_mask == NEW_STATUS_MASK:
+        return "new"
+    elif status_mask & NEW_STATUS_MASK:
+        return "changed"
     else:
         return "old"
 
 
-def check_indirectly_called(master_cur, binary_id, func_id):
-    """
-    Check if a function has no incoming direct call edges from within the same binary.
-    This indicates it's likely called indirectly (virtual function, callback, etc.).
-    
-    Returns:
-        True if no direct calls found, False otherwise
-    """
-    master_cur.execute("""
-        SELECT COUNT(*) 
-        FROM call_edges_static 
-        WHERE binary_id = ? AND dst_func_id = ?
-    """, (binary_id, func_id))
-    
-    result = master_cur.fetchone()
-    return result[0] == 0
-
-
-def export_module_data(master_conn, cov_conn, binary_id):
+def export_module_data(cov_conn, binary_id, progress=print):
     """
     Export all data for a single module/binary.
     
+    cov_conn must have master.db attached as schema m. Progress lines are
+    passed to progress (printed by default).
+    
     Returns:
         Dictionary with module data in visualization format
     """
-    master_cur = master_conn.cursor()
+    # Result sets are consumed by iterating the cursor, never fetchall(): rows
+    # are stepped one at a time instead of first being copied into a list.
+    # No loop below issues another query on the cursor it iterates.
     cov_cur = cov_conn.cursor()
     
-    print(f"  Exporting binary_id={binary_id}...")
+    # The same RVAs are formatted again and again (each block as a block, an
+    # edge endpoint several times over, a frontier); format each one once per
+    # binary and share the string
+    rva_hex = {}
     
-    # Get binary metadata
-    master_cur.execute("""
-        SELECT binary_name, sha256_hash
-        FROM analyzed_binaries
-        WHERE binary_id = ?
-    """, (binary_id,))
-    binary_name, sha256_hash = master_cur.fetchone()
+    def hex_rva(rva):
+        text = rva_hex.get(rva)
+        if text is None:
+            text = rva_hex[rva] = hex(rva)
+        return text
     
-    # Get module metadata
+    progress(f"  Exporting binary_id={binary_id}...")
+    
+    # Get binary and module metadata (the module falls back to the binary
+    # name when the binary is not mapped to a module)
     cov_cur.execute("""
-        SELECT module_id, module_name
-        FROM module_binary_map
-        WHERE binary_id = ?
+        SELECT ab.binary_name, ab.sha256_hash, mb.module_id,
+               CASE WHEN mb.binary_id IS NULL THEN ab.binary_name ELSE mb.module_name END
+        FROM m.analyzed_binaries ab
+        LEFT JOIN module_binary_map mb ON mb.binary_id = ab.binary_id
+        WHERE ab.binary_id = ?
+        LIMIT 1
     """, (binary_id,))
-    result = cov_cur.fetchone()
-    module_id, module_name = result if result else (None, binary_name)
+    binary_name, sha256_hash, module_id, module_name = cov_cur.fetchone()
     
-    print(f"    Module: {module_name}")
+    progress(f"    Module: {module_name}")
     
-    # Get all covered blocks (in A or B)
+    # Get all covered blocks (in A or B) together with their span, frontier
+    # type and scores, and attribution in one statement: SQLite resolves the
+    # lookups by primary key instead of Python merging five result sets, and
+    # rows for blocks that are never emitted are not fetched at all. Per-block
+    # fields are kept as parallel dicts keyed by bb_rva (plain tuples for
+    # multi-field rows) rather than one dict per block; output dicts are
+    # built only once, at emit time.
     cov_cur.execute("""
-        SELECT bb_rva, func_id, in_A, in_B, is_new
-        FROM bb_labels
-        WHERE binary_id = ?
+        SELECT l.bb_rva, l.func_id, (l.in_B != 0) << 1 | (l.in_A != 0) AS status_code,
+               b.bb_start_va, b.bb_end_va,
+               ft.frontier_type,
+               fa.attributed_new_bb_count, fa.unique_new_bb_count, fa.shared_new_bb_count,
+               ba.frontier_bb_rva, ba.is_shared
+        FROM bb_labels l
+        LEFT JOIN m.basic_blocks b 
+          ON b.binary_id = l.binary_id AND b.bb_rva = l.bb_rva
+        LEFT JOIN frontier_targets ft 
+          ON ft.binary_id = l.binary_id AND ft.bb_rva = l.bb_rva
+        LEFT JOIN frontier_attribution fa 
+          ON fa.binary_id = ft.binary_id AND fa.frontier_bb_rva = ft.bb_rva
+        LEFT JOIN bb_attributed_to ba 
+          ON ba.binary_id = l.binary_id AND ba.new_bb_rva = l.bb_rva
+        WHERE l.binary_id = ?
+        ORDER BY l.func_id, l.bb_rva
     """, (binary_id,))
     
-    covered_blocks = {}
-    for bb_rva, func_id, in_A, in_B, is_new in cov_cur.fetchall():
-        status = get_block_status(in_A, in_B)
-        covered_blocks[bb_rva] = {
-            'func_id': func_id,
-            'status': status,
-            'in_A': in_A,
-            'in_B': in_B,
-            'is_new': is_new
-        }
-    
-    print(f"    Found {len(covered_blocks)} covered blocks")
+    block_status = {}
+    func_blocks = {}         # func_id -> its bb_rvas, ascending
+    func_status_mask = {}    # func_id -> OR of 1 << status_code over its blocks
+    block_span = {}          # bb_rva -> (start_va, end_va), blocks known to master.db
+    frontier_type_of = {}    # bb_rva -> frontier_type
+    frontier_scores = {}     # bb_rva -> {total, unique, shared}, scored frontiers
+    block_attribution = {}   # bb_rva -> (frontier_bb_rva, is_shared)
+    status_counts = [0] * len(BLOCK_STATUS)
+    current_func_id = None
+    for (bb_rva, func_id, status_code, start_va, end_va,
+         frontier_type, total, unique, shared,
+         frontier_bb_rva, is_shared) in cov_cur:
+        block_status[bb_rva] = BLOCK_STATUS[status_code]
+        if func_id != current_func_id:
+            # Rows arrive grouped by function: start the next group
+            current_func_id = func_id
+            func_bb_rvas = func_blocks[func_id] = []
+            status_mask = 0
+        func_bb_rvas.append(bb_rva)
+        status_mask |= 1 << status_code
+        func_status_mask[func_id] = status_mask
+        status_counts[status_code] += 1
+        if start_va is not None:
+            block_span[bb_rva] = (start_va, end_va)
+        if frontier_type is not None:
+            frontier_type_of[bb_rva] = frontier_type
+            if total is not None:
+                frontier_scores[bb_rva] = {
+                    'total_new_bb': total,
+                    'unique_new_bb': unique,
+                    'shared_new_bb': shared
+                }
+        if is_shared is not None:
+            block_attribution[bb_rva] = (frontier_bb_rva, is_shared)
     
-    # Group blocks by function
-    func_blocks = defaultdict(dict)
-    for bb_rva, block_data in covered_blocks.items():
-        func_id = block_data['func_id']
-        func_blocks[func_id][bb_rva] = block_data['status']
+    progress(f"    Found {len(block_status)} covered blocks")
     
     # Get all covered functions
     covered_func_ids = set(func_blocks.keys())
     
-    # Get block details from master.db
-    block_details = {}
-    if covered_blocks:
-        placeholders = ','.join('?' * len(covered_blocks))
-        master_cur.execute(f"""
-            SELECT bb_rva, bb_start_va, bb_end_va
-            FROM basic_blocks
-            WHERE binary_id = ? AND bb_rva IN ({placeholders})
-        """, [binary_id] + list(covered_blocks.keys()))
-        
-        for bb_rva, start_va, end_va in master_cur.fetchall():
-            block_details[bb_rva] = {
-                'start_va': start_va,
-                'end_va': end_va,
-                'size': end_va - start_va
-            }
-    
-    # Get frontier information
-    cov_cur.execute("""
-        SELECT bb_rva, func_id, frontier_type
-        FROM frontier_targets
-        WHERE binary_id = ?
-    """, (binary_id,))
-    
-    frontier_blocks = {}
-    for bb_rva, func_id, frontier_type in cov_cur.fetchall():
-        frontier_blocks[bb_rva] = {'frontier_type': frontier_type}
-    
-    # NEW: Get frontier attribution scores per block
-    cov_cur.execute("""
-        SELECT frontier_bb_rva, attributed_new_bb_count, 
-               unique_new_bb_count, shared_new_bb_count
-        FROM frontier_attribution
-        WHERE binary_id = ?
-    """, (binary_id,))
-
-    for bb_rva, total, unique, shared in cov_cur.fetchall():
-        if bb_rva in frontier_blocks:
-            frontier_blocks[bb_rva].update({
-                'total_new_bb': total,
-                'unique_new_bb': unique,
-                'shared_new_bb': shared
-            })
-
-    # Get attribution information
-    cov_cur.execute("""
-        SELECT new_bb_rva, frontier_bb_rva, is_shared
-        FROM bb_attributed_to
-        WHERE binary_id = ?
-    """, (binary_id,))
-    
-    block_attribution = {}
-    for new_bb_rva, frontier_bb_rva, is_shared in cov_cur.fetchall():
-        block_attribution[new_bb_rva] = {
-            'frontier_bb_rva': frontier_bb_rva,
-            'is_shared': bool(is_shared)
-        }
-    
     # Get function attribution scores
     cov_cur.execute("""
         SELECT func_id, unique_new_bb, shared_new_bb, total_new_bb,
@@ -199,7 +230,7 @@ def export_module_data(master_conn, cov_conn, binary_id):
     """, (binary_id,))
     
     func_attribution = {}
-    for row in cov_cur.fetchall():
+    for row in cov_cur:
         func_id, unique_bb, shared_bb, total_bb, frontier_count, strong_count, weak_count = row
         func_attribution[func_id] = {
             'total_new_bb': total_bb,
@@ -212,121 +243,107 @@ def export_module_data(master_conn, cov_conn, binary_id):
     
     # Get function details from master.db
     if covered_func_ids:
-        placeholders = ','.join('?' * len(covered_func_ids))
-        master_cur.execute(f"""
+        # Functions with at least one direct call edge from within the binary,
+        # fetched once instead of one COUNT(*) query per function. A function
+        # missing from this set is likely called indirectly (virtual function,
+        # callback, etc.)
+        cov_cur.execute("""
+            SELECT DISTINCT dst_func_id
+            FROM m.call_edges_static
+            WHERE binary_id = ?
+        """, (binary_id,))
+        called_func_ids = {row[0] for row in cov_cur}
+        
+        cov_cur.execute("""
             SELECT func_id, func_name, entry_rva, start_va, end_va, func_size
-            FROM functions
-            WHERE binary_id = ? AND func_id IN ({placeholders})
-        """, [binary_id] + list(covered_func_ids))
+            FROM m.functions
+            WHERE binary_id = ?
+        """, (binary_id,))
         
         functions_data = {}
-        for func_id, func_name, entry_rva, start_va, end_va, func_size in master_cur.fetchall():
+        function_status_counts = {"new": 0, "changed": 0, "old": 0}
+        for func_id, func_name, entry_rva, start_va, end_va, func_size in cov_cur:
+            if func_id not in covered_func_ids:
+                continue
+            
+            # Blocks in address order (the block query sorts them)
+            bb_rvas = func_blocks[func_id]
+            
             # Determine function status
-            func_status = get_function_status(func_blocks[func_id])
+            func_status = get_function_status(func_status_mask[func_id])
+            function_status_counts[func_status] += 1
             
             # Check if indirectly called
-            is_indirectly_called = check_indirectly_called(master_cur, binary_id, func_id)
+            is_indirectly_called = func_id not in called_func_ids
             
             # Build blocks array for this function
             blocks_array = []
-            for bb_rva in func_blocks[func_id].keys():
-                block_info = covered_blocks[bb_rva]
-                details = block_details.get(bb_rva, {'start_va': None, 'end_va': None, 'size': 0})
-                
-                block_obj = {
-                    'bb_rva': hex(bb_rva),
-                    'bb_start_va': hex(details['start_va']) if details['start_va'] else None,
-                    'bb_end_va': hex(details['end_va']) if details['end_va'] else None,
-                    'bb_size': details['size'],
-                    'status': block_info['status']
-                }
+            for bb_rva in bb_rvas:
+                bb_start_va, bb_end_va = block_span.get(bb_rva, (None, None))
                 
-                # Add frontier info if applicable
-                if bb_rva in frontier_blocks:
-                    frontier_info = frontier_blocks[bb_rva]
-                    block_obj['is_frontier'] = True
-                    block_obj['frontier_type'] = frontier_info['frontier_type']
-                    
+                if bb_rva in frontier_type_of:
                     # Add attribution scores if this frontier unlocked coverage
-                    block_obj['frontier_attribution'] = {
-                        'total_new_bb': frontier_info.get('total_new_bb', 0),
-                        'unique_new_bb': frontier_info.get('unique_new_bb', 0),
-                        'shared_new_bb': frontier_info.get('shared_new_bb', 0)
-                    }
+                    is_frontier = True
+                    frontier_type = frontier_type_of[bb_rva]
+                    frontier_attribution = frontier_scores.get(bb_rva, NO_FRONTIER_SCORES)
                 else:
-                    block_obj['is_frontier'] = False
-                    block_obj['frontier_type'] = None
-                    block_obj['frontier_attribution'] = None
+                    is_frontier = False
+                    frontier_type = None
+                    frontier_attribution = None
                 
-                # Add attribution info if applicable
                 if bb_rva in block_attribution:
-                    attr = block_attribution[bb_rva]
-                    block_obj['attribution'] = {
+                    frontier_bb_rva, is_shared = block_attribution[bb_rva]
+                    attribution = {
                         'is_attributed': True,
-                        'frontier_bb_rva': hex(attr['frontier_bb_rva']) if attr['frontier_bb_rva'] else None,
-                        'is_shared': attr['is_shared']
+                        'frontier_bb_rva': hex_rva(frontier_bb_rva) if frontier_bb_rva else None,
+                        'is_shared': bool(is_shared)
                     }
                 else:
-                    block_obj['attribution'] = {
-                        'is_attributed': False,
-                        'frontier_bb_rva': None,
-                        'is_shared': False
-                    }
+                    attribution = NOT_ATTRIBUTED
                 
-                blocks_array.append(block_obj)
+                blocks_array.append(Block(
+                    bb_rva=hex_rva(bb_rva),
+                    bb_start_va=hex(bb_start_va) if bb_start_va else None,
+                    bb_end_va=hex(bb_end_va) if bb_end_va else None,
+                    bb_size=bb_end_va - bb_start_va if bb_rva in block_span else 0,
+                    status=block_status[bb_rva],
+                    is_frontier=is_frontier,
+                    frontier_type=frontier_type,
+                    frontier_attribution=frontier_attribution,
+                    attribution=attribution
+                ))
             
             # Build function object
-            func_obj = {
-                'func_id': func_id,
-                'func_name': func_name,
-                'entry_rva': hex(entry_rva),
-                'start_va': hex(start_va),
-                'end_va': hex(end_va),
-                'func_size': func_size,
-                'status': func_status,
-                'is_indirectly_called': is_indirectly_called,
-                'blocks': sorted(blocks_array, key=lambda x: int(x['bb_rva'], 16))
-            }
-            
-            # Add attribution scores if available
-            if func_id in func_attribution:
-                func_obj['attribution'] = func_attribution[func_id]
-            else:
-                func_obj['attribution'] = {
-                    'total_new_bb': 0,
-                    'unique_new_bb': 0,
-                    'shared_new_bb': 0,
-                    'frontier_count': 0,
-                    'strong_frontier_count': 0,
-                    'weak_frontier_count': 0
-                }
+            func_obj = Function(
+                func_id=func_id,
+                func_name=func_name,
+                entry_rva=hex_rva(entry_rva),
+                start_va=hex(start_va),
+                end_va=hex(end_va),
+                func_size=func_size,
+                status=func_status,
+                is_indirectly_called=is_indirectly_called,
+                blocks=blocks_array,
+                attribution=func_attribution.get(func_id, NO_FUNCTION_SCORES)
+            )
             
             functions_data[func_id] = func_obj
     else:
         functions_data = {}
+        function_status_counts = {"new": 0, "changed": 0, "old": 0}
     
-    print(f"    Processed {len(functions_data)} functions")
+    progress(f"    Processed {len(functions_data)} functions")
     
-    # Get edges (CFG + call edges) for covered blocks
-    edges_array = []
+    # Get edges (CFG + call edges) for covered blocks. Both result sets are
+    # consumed by comprehensions straight off the cursor
     
     # Get frontier edges
     cov_cur.execute("""
-        SELECT src_bb_rva, dst_bb_rva, edge_type
+        SELECT src_bb_rva, dst_bb_rva
         FROM frontier_edges
         WHERE binary_id = ?
     """, (binary_id,))
-    
-    frontier_edge_set = set()
-    for src, dst, edge_type in cov_cur.fetchall():
-        frontier_edge_set.add((src, dst))
-    
-    cov_cur.execute("""
-        SELECT src_bb_rva, dst_bb_rva, edge_type
-        FROM graph_B_edges
-        WHERE binary_id = ? 
-          AND edge_type NOT LIKE 'super_root%'
-    """, (binary_id,))
+    frontier_edge_set = set(cov_cur)
 
     ## Get all edges in G_B (executed graph)
     #cov_cur.execute("""
@@ -338,27 +355,37 @@ def export_module_data(master_conn, cov_conn, binary_id):
     #      AND edge_type NOT LIKE 'super_root%'
     #""", (binary_id,))
 
-    for src_bb_rva, dst_bb_rva, edge_type in cov_cur.fetchall():
-        edge_obj = {
-            'src_bb_rva': hex(src_bb_rva),
-            'dst_bb_rva': hex(dst_bb_rva),
+    # Explicit order (served by the graph_B_edges PK) so the edges array does
+    # not depend on how the analyzer laid the table out
+    cov_cur.execute("""
+        SELECT src_bb_rva, dst_bb_rva, edge_type
+        FROM graph_B_edges
+        WHERE binary_id = ? 
+          AND edge_type NOT LIKE 'super_root%'
+        ORDER BY src_bb_rva, dst_bb_rva, edge_type
+    """, (binary_id,))
+    edges_array = [
+        {
+            'src_bb_rva': hex_rva(src_bb_rva),
+            'dst_bb_rva': hex_rva(dst_bb_rva),
             'edge_type': edge_type,
             'is_frontier_edge': (src_bb_rva, dst_bb_rva) in frontier_edge_set
         }
-        edges_array.append(edge_obj)
+        for src_bb_rva, dst_bb_rva, edge_type in cov_cur
+    ]
     
-    print(f"    Found {len(edges_array)} edges")
+    progress(f"    Found {len(edges_array)} edges")
     
-    # Calculate module-level statistics
-    total_blocks = len(covered_blocks)
-    new_blocks = sum(1 for b in covered_blocks.values() if b['status'] == 'new')
-    blocks_in_A = sum(1 for b in covered_blocks.values() if b['in_A'])
-    blocks_in_B = sum(1 for b in covered_blocks.values() if b['in_B'])
+    # Calculate module-level statistics from the counts taken while reading
+    total_blocks = len(block_status)
+    new_blocks = status_counts[IN_B_BIT]  # in B only
+    blocks_in_A = status_counts[IN_A_BIT] + status_counts[IN_A_BIT | IN_B_BIT]
+    blocks_in_B = status_counts[IN_B_BIT] + status_counts[IN_A_BIT | IN_B_BIT]
     
     total_functions = len(functions_data)
-    new_functions = sum(1 for f in functions_data.values() if f['status'] == 'new')
-    changed_functions = sum(1 for f in functions_data.values() if f['status'] == 'changed')
-    old_functions = sum(1 for f in functions_data.values() if f['status'] == 'old')
+    new_functions = function_status_counts['new']
+    changed_functions = function_status_counts['changed']
+    old_functions = function_status_counts['old']
     
     # Determine module status
     if new_functions > 0 or changed_functions > 0:
@@ -387,13 +414,143 @@ def export_module_data(master_conn, cov_conn, binary_id):
             'blocks_in_A': blocks_in_A,
             'blocks_in_B': blocks_in_B
         },
-        'functions': sorted(functions_data.values(), key=lambda x: x['func_id']),
+        'functions': sorted(functions_data.values(), key=lambda x: x.func_id),
         'edges': edges_array
     }
     
     return module_obj
 
 
+def create_export_indexes(master_conn):
+    """
+    Create the master.db index the export needs beyond the analyzer's.
+    
+    Every other per-binary export query is already served by a primary key or
+    an index whose leading column is binary_id. The directly-called function
+    lookup reads DISTINCT dst_func_id per binary; with this index it streams
+    in index order instead of filling a temp B-tree. Runs on a short-lived
+    connection before master.db is attached read-only. The index is optional:
+    nothing is written when it already exists, and when master.db cannot be
+    written (e.g. a shared read-only copy) the export runs without it.
+    """
+    cur = master_conn.cursor()
+    cur.execute("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'idx_call_edges_dst'")
+    if cur.fetchone():
+        return
+    
+    try:
+        cur.execute("""
+            CREATE INDEX IF NOT EXISTS idx_call_edges_dst
+            ON call_edges_static(binary_id, dst_func_id)
+        """)
+        cur.execute("ANALYZE call_edges_static")
+        master_conn.commit()
+    except sqlite3.OperationalError as e:
+        master_conn.rollback()
+        print(f"  Warning: Could not index master.db ({e}); continuing without it")
+
+
+def open_export_db(cov_db, master_db):
+    """
+    Open cov_db for the export with master_db attached read-only as schema m.
+    
+    The export only reads, so the connection refuses writes, keeps temp
+    B-trees in memory and gives both schemas a large page cache and
+    memory-mapped reads.
+    """
+    conn = sqlite3.connect(Path(cov_db).resolve().as_uri(), uri=True)
+    conn.execute("ATTACH DATABASE ? AS m", (Path(master_db).resolve().as_uri() + "?mode=ro",))
+    conn.execute("PRAGMA query_only=1")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    for schema in ("main", "m"):
+        conn.execute(f"PRAGMA {schema}.cache_size=-262144")  # 256 MiB
+        conn.execute(f"PRAGMA {schema}.mmap_size=1073741824")  # 1 GiB
+    return conn
+
+
+def _slots_to_dict(obj):
+    """json.dumps default hook: serialize a Block/Function as a key-ordered dict."""
+    try:
+        return {name: getattr(obj, name) for name in obj.__slots__}
+    except AttributeError:
+        raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable") from None
+
+
+def dumps_json(obj, pretty=False):
+    """
+    Serialize obj to UTF-8 JSON bytes, with orjson when it is installed.
+    
+    pretty indents nested values by two spaces. Block and Function instances
+    are serialized as objects (natively by orjson, via a default hook by json).
+    """
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if pretty else 0)
+    return json.dumps(obj, indent=2 if pretty else None,
+                      default=_slots_to_dict).encode('utf-8')
+
+
+def export_module_json(cov_conn, binary_id, pretty=False, progress=print):
+    """
+    Export one binary and serialize it.
+    
+    Returns:
+        (JSON bytes, function count, block count)
+    """
+    module_data = export_module_data(cov_conn, binary_id, progress)
+    statistics = module_data['statistics']
+    return (dumps_json(module_data, pretty),
+            statistics['total_functions'], statistics['total_blocks'])
+
+
+# Per-process connection of an export pool worker, opened once by
+# _init_export_worker and reused for every binary the worker exports
+_worker_conn = None
+
+
+def _init_export_worker(cov_db, master_db):
+    """Process-pool initializer: open the worker's connection."""
+    global _worker_conn
+    _worker_conn = open_export_db(cov_db, master_db)
+
+
+def _export_module_worker(task):
+    """
+    Process-pool entry point: export_module_json over the worker's connection.
+    
+    Progress lines are collected rather than printed, so concurrent binaries do
+    not interleave on stdout. Returns (progress lines, export_module_json result).
+    """
+    binary_id, pretty = task
+    progress_lines = []
+    result = export_module_json(_worker_conn, binary_id, pretty, progress_lines.append)
+    return progress_lines, result
+
+
+def print_worker_progress(worker_results):
+    """Print each worker result's progress lines, then yield its export result."""
+    for progress_lines, result in worker_results:
+        for line in progress_lines:
+            print(line)
+        yield result
+
+
+def ordered_pool_results(pool, fn, tasks, window):
+    """
+    Yield fn(task) for each task, in task order, computed in pool.
+    
+    At most window tasks are submitted but not yet yielded, which bounds how
+    many finished results can pile up behind a slow earlier one (unlike
+    Executor.map, which submits every task up front).
+    """
+    tasks = iter(tasks)
+    pending = deque(pool.submit(fn, task) for task in islice(tasks, window))
+    while pending:
+        result = pending.popleft().result()
+        for task in islice(tasks, 1):
+            pending.append(pool.submit(fn, task))
+        yield result
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="Export coverage diff data to JSON for visualization"
@@ -404,6 +561,8 @@ def main():
                        help="Output JSON file (default: coverage_viz_data.json)")
     parser.add_argument("--pretty", action="store_true",
                        help="Pretty-print JSON output")
+    parser.add_argument("-j", "--jobs", type=int, default=1,
+                       help="Worker processes for per-binary export (default: 1)")
     
     args = parser.parse_args()
     
@@ -419,9 +578,16 @@ def main():
     print("Coverage Visualization Data Exporter")
     print("=" * 60)
     
-    # Connect to databases
+    # Index master.db up front; the export itself only reads it
     master_conn = sqlite3.connect(args.master_db)
-    cov_conn = sqlite3.connect(args.cov_db)
+    try:
+        create_export_indexes(master_conn)
+    finally:
+        master_conn.close()
+    
+    # Connect to the coverage database with master.db attached, so one
+    # statement can join across both
+    cov_conn = open_export_db(args.cov_db, args.master_db)
     
     try:
         cov_cur = cov_conn.cursor()
@@ -433,33 +599,66 @@ def main():
         print(f"Found {len(binary_ids)} binaries to export")
         print()
         
-        # Export data for each binary
-        modules = []
-        for binary_id in binary_ids:
-            module_data = export_module_data(master_conn, cov_conn, binary_id)
-            modules.append(module_data)
-        
-        # Build final output
-        output = {
+        # Stream the output: write the envelope, then each module as soon as it
+        # is built, so serially only one module's tree is in memory at a time.
+        # Binaries are independent, so with --jobs > 1 they are exported and
+        # serialized in a process pool; each worker opens one read-only
+        # connection for its lifetime and only the encoded modules travel
+        # back, written in binary_ids order. At most 2 * jobs binaries are in
+        # flight, so while waiting on a slow earlier binary the parent holds at
+        # most that many encoded modules, not the whole export.
+        envelope = dumps_json({
             'version': '1.0',
             'description': 'Coverage diff visualization data',
-            'modules': modules
-        }
+            'modules': []
+        }, args.pretty)
+        head, _, tail = envelope.rpartition(b'[]')
+        # Modules are encoded on their own at indent level 0; with --pretty they
+        # are shifted to their place in the modules array (two levels deep) so
+        # the file has the same layout as dumping the whole tree at once
+        if args.pretty:
+            array_open, separator, array_close = b'[\n', b',\n', b'\n  ]'
+        else:
+            array_open, separator, array_close = b'[', b',', b']'
         
-        # Write JSON
-        with open(args.output, 'w') as f:
-            if args.pretty:
-                json.dump(output, f, indent=2)
+        module_count = 0
+        total_functions = 0
+        total_blocks = 0
+        with ExitStack() as stack:
+            if args.jobs > 1 and len(binary_ids) > 1:
+                pool = stack.enter_context(ProcessPoolExecutor(
+                    max_workers=min(args.jobs, len(binary_ids)),
+                    initializer=_init_export_worker,
+                    initargs=(args.cov_db, args.master_db)))
+                # Workers hand their progress lines back with each module, and
+                # they are printed here in binary_ids order
+                encoded_modules = print_worker_progress(ordered_pool_results(
+                    pool, _export_module_worker,
+                    ((binary_id, args.pretty) for binary_id in binary_ids),
+                    window=2 * args.jobs))
             else:
-                json.dump(output, f)
+                encoded_modules = (export_module_json(cov_conn, binary_id, args.pretty)
+                                   for binary_id in binary_ids)
+            
+            f = stack.enter_context(open(args.output, 'wb'))
+            f.write(head)
+            for module_json, function_count, block_count in encoded_modules:
+                f.write(separator if module_count else array_open)
+                if args.pretty:
+                    module_json = b'    ' + module_json.replace(b'\n', b'\n    ')
+                f.write(module_json)
+                module_count += 1
+                total_functions += function_count
+                total_blocks += block_count
+            f.write((array_close if module_count else b'[]') + tail)
         
         print()
         print("=" * 60)
         print(f"Export complete!")
         print(f"Output written to: {args.output}")
-        print(f"Total modules: {len(modules)}")
-        print(f"Total functions: {sum(m['statistics']['total_functions'] for m in modules)}")
-        print(f"Total blocks: {sum(m['statistics']['total_blocks'] for m in modules)}")
+        print(f"Total modules: {module_count}")
+        print(f"Total functions: {total_functions}")
+        print(f"Total blocks: {total_blocks}")
         print("=" * 60)
         
     except Exception as e:
@@ -468,7 +667,6 @@ def main():
         traceback.print_exc()
         sys.exit(1)
     finally:
-        master_conn.close()
         cov_conn.close()
 
 